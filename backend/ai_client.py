@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared task"""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def start(self, key: str, func: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """The in-flight task for `key`, starting `func` if there is none"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return task
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        # Shield so one caller giving up doesn't cancel the call for everyone else
+        return await asyncio.shield(self.start(key, func))
+
+
+_inflight = SingleFlight()
+
+# Upstream chat calls and token usage per model since startup, for cost metrics
+token_usage: Dict[str, Dict[str, int]] = {}
+
+
+def _record_usage(model: str, usage) -> None:
+    counts = token_usage.setdefault(model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+    counts["requests"] += 1
+    if usage is not None:
+        counts["prompt_tokens"] += usage.prompt_tokens or 0
+        counts["completion_tokens"] += usage.completion_tokens or 0
+
+
+def get_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client (honours OPENAI_API_KEY and OPENAI_BASE_URL)"""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=TIMEOUT_SECONDS)
+    return _client
+
+
+def get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def request_key(kind: str, params: dict) -> str:
+    """Stable hash of an API request used to deduplicate identical in-flight calls"""
+    payload = json.dumps({"kind": kind, **params}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def _limited(coro_factory: Callable[[], Awaitable[Any]], timeout: Optional[float]) -> Any:
+    async with get_semaphore():
+        return await asyncio.wait_for(coro_factory(), timeout=timeout or TIMEOUT_SECONDS)
+
+
+async def chat_completion(timeout: Optional[float] = None, max_retries: Optional[int] = None, **params) -> str:
+    """Run a chat completion under the concurrency limit and return the message content.
+
+    `max_retries` overrides the client's own retries, e.g. 0 for callers that handle rate limits themselves.
+    """
+    client = get_client() if max_retries is None else get_client().with_options(max_retries=max_retries)
+
+    async def call():
+        response = await _limited(lambda: client.chat.completions.create(**params), timeout)
+        _record_usage(params.get("model"), response.usage)
+        return response.choices[0].message.content
+
+    return await _inflight.run(request_key("chat", params), call)
+
+
+async def create_embeddings(texts: List[str], model: str, timeout: Optional[float] = None) -> List[List[float]]:
+    """Embed a batch of texts under the concurrency limit, in input order"""
+    params = {"input": texts, "model": model}
+
+    async def call():
+        response = await _limited(lambda: get_client().embeddings.create(**params), timeout)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    return await _inflight.run(request_key("embeddings", params), call)
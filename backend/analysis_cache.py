@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import crud_async, schemas
+from backend.ai_client import SingleFlight
+from backend.database import AsyncReadSessionLocal, AsyncSessionLocal
+from backend.models import Startup
+from backend.openai_utils import ANALYSIS_PROMPT_VERSION, FALLBACK_ANALYSIS, generate_startup_analysis
+
+LEASE_SECONDS = float(os.getenv("AI_ANALYSIS_LEASE_SECONDS", "60"))  # a crashed worker's claim expires after this
+WAIT_SECONDS = float(os.getenv("AI_ANALYSIS_WAIT_SECONDS", "10"))  # how long to wait on another worker's generation
+POLL_INTERVAL_SECONDS = 0.25
+
+# Startup fields that feed the analysis prompt
+ANALYSIS_FIELDS = ("name", "sector", "description", "valuation", "revenue", "growth_rate", "funding_stage", "employees", "location")
+
+_generations = SingleFlight()
+
+
+def profile_hash(startup: Startup) -> str:
+    """Content hash of everything the analysis depends on; a change makes the stored analysis stale"""
+    payload = {field: getattr(startup, field) for field in ANALYSIS_FIELDS}
+    payload["prompt_version"] = ANALYSIS_PROMPT_VERSION
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def get_startup_analysis(db: AsyncSession, startup_id: int) -> Optional[Tuple[Optional[dict], str]]:
+    """(analysis, status) for a startup, or None if it doesn't exist.
+
+    status is "ready", "stale" (the profile changed; the old analysis is served while a
+    new one is generated in the background), "fallback" (generation failed) or "pending"
+    (another worker is still generating, analysis is None). Concurrent requests share one
+    generation per startup: in this process through single-flight, across processes
+    through the pending claim stored on the startup row.
+    """
+    startup = await crud_async.get_startup_by_id(db, startup_id)
+    if startup is None:
+        return None
+    current = profile_hash(startup)
+    # The caller's session isn't needed while the LLM runs
+    await db.close()
+
+    if startup.ai_summary and startup.ai_summary_hash == current:
+        return json.loads(startup.ai_summary), "ready"
+    key = f"{startup_id}:{current}"
+    if startup.ai_summary:
+        _generations.start(key, lambda: _regenerate(startup, current))
+        return json.loads(startup.ai_summary), "stale"
+    return await _generations.run(key, lambda: _generate(startup, current))
+
+
+async def _generate(startup: Startup, current: str) -> Tuple[Optional[dict], str]:
+    """Generate and store the analysis, or wait for the worker that already claimed it"""
+    deadline = time.time() + WAIT_SECONDS
+    while True:
+        async with AsyncSessionLocal() as db:
+            claimed = await crud_async.claim_ai_summary(db, startup.id, current, LEASE_SECONDS)
+        if claimed:
+            return await _generate_claimed(startup, current)
+
+        async with AsyncReadSessionLocal() as db:
+            latest = await crud_async.get_startup_by_id(db, startup.id)
+        if latest is not None and latest.ai_summary and latest.ai_summary_hash == current:
+            return json.loads(latest.ai_summary), "ready"
+        if time.time() >= deadline:
+            return None, "pending"
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+async def _regenerate(startup: Startup, current: str):
+    """Background refresh of a stale analysis; skipped if another worker is already on it"""
+    async with AsyncSessionLocal() as db:
+        claimed = await crud_async.claim_ai_summary(db, startup.id, current, LEASE_SECONDS)
+    if claimed:
+        await _generate_claimed(startup, current)
+
+
+async def _generate_claimed(startup: Startup, current: str) -> Tuple[dict, str]:
+    try:
+        analysis = schemas.AIAnalysis(**await generate_startup_analysis(startup)).model_dump()
+    except Exception as e:
+        print(f"Error analyzing startup {startup.id}: {e}")
+        # Not stored, so the next request retries
+        async with AsyncSessionLocal() as db:
+            await crud_async.release_ai_summary(db, startup.id)
+        return dict(FALLBACK_ANALYSIS), "fallback"
+    async with AsyncSessionLocal() as db:
+        await crud_async.set_ai_summary(db, startup.id, json.dumps(analysis), current)
+    return analysis, "ready"
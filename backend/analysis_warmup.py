@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+import openai
+from sqlalchemy import select
+
+from backend import crud_async, schemas
+from backend.ai_client import token_usage
+from backend.analysis_cache import ANALYSIS_FIELDS, LEASE_SECONDS, profile_hash
+from backend.database import AsyncReadSessionLocal, AsyncSessionLocal, async_engine, async_read_engine
+from backend.models import Startup
+from backend.openai_utils import ANALYSIS_MODEL, generate_startup_analysis
+
+CHECKPOINT_PATH = os.getenv("AI_ANALYSIS_WARMUP_CHECKPOINT", "analysis_warmup.json")  # progress of an interrupted run
+MODEL_PRICES = {"gpt-4o-mini": (0.15, 0.60)}  # USD per million prompt / completion tokens, for the cost estimate
+PAGE_SIZE = 1000  # startups scanned per query
+CHECKPOINT_EVERY = 50  # finished startups between checkpoint writes
+MAX_BACKOFF_SECONDS = 60.0
+
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError, asyncio.TimeoutError)
+COUNTERS = ("generated", "failed", "skipped", "rate_limited", "prompt_tokens", "completion_tokens")
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that halves and pauses every worker when the API rate-limits us,
+    then grows back by one after each `limit` successes in a row (AIMD)"""
+
+    def __init__(self, max_limit: int, backoff: float = 1.0):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.backoff = backoff
+        self.active = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._streak = 0  # rate limits since the last success
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.active < self.limit:
+                    self.active += 1
+                    return
+                else:
+                    await self._cond.wait()
+
+    async def release(self, rate_limited: bool = False, retry_after: Optional[float] = None):
+        async with self._cond:
+            self.active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                # Honour the server's Retry-After, else back off exponentially while limits persist
+                delay = retry_after if retry_after is not None else self.backoff * 2 ** self._streak
+                self._streak += 1
+                self.paused_until = max(self.paused_until, time.monotonic() + min(delay, MAX_BACKOFF_SECONDS))
+            else:
+                self._streak = 0
+                self._successes += 1
+                if self.limit < self.max_limit and self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def retry_after_seconds(error: openai.RateLimitError) -> Optional[float]:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def load_checkpoint(path: str) -> Optional[dict]:
+    """State of an unfinished run at `path`, or None to start from the beginning"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    return None if state.get("finished") else state
+
+
+def save_checkpoint(path: str, state: dict):
+    # Write then rename, so a crash mid-write never leaves a truncated checkpoint
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(state, f)
+    os.replace(temporary, path)
+
+
+def cost_usd(prompt_tokens: int, completion_tokens: int, model: str = ANALYSIS_MODEL) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return round((prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6, 6)
+
+
+async def iter_pending(after_id: int = 0, page_size: int = PAGE_SIZE) -> AsyncIterator[Tuple[object, str]]:
+    """Yield (row, profile hash) for startups after `after_id` whose analysis is missing or stale, in id order"""
+    columns = [getattr(Startup, field) for field in ANALYSIS_FIELDS]
+    while True:
+        async with AsyncReadSessionLocal() as db:
+            rows = (await db.execute(
+                select(Startup.id, Startup.ai_summary.is_(None).label("missing"), Startup.ai_summary_hash, *columns)
+                .where(Startup.id > after_id)
+                .order_by(Startup.id)
+                .limit(page_size)
+            )).all()
+        if not rows:
+            return
+        after_id = rows[-1].id
+        for row in rows:
+            current = profile_hash(row)
+            if row.missing or row.ai_summary_hash != current:
+                yield row, current
+
+
+async def warm_one(row, current: str, limiter: AdaptiveLimiter, stats: Dict[str, int], latencies: List[float],
+                   max_retries: int = 5) -> str:
+    """Generate and store one startup's analysis; returns "generated", "failed" or "skipped".
+
+    Takes the same pending claim as the detail endpoint, so a startup being generated
+    by a server (or another job) is skipped rather than generated twice. Rate limits and
+    transient errors are retried up to `max_retries` times.
+    """
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        error = None
+        try:
+            try:
+                async with AsyncSessionLocal() as db:
+                    if not await crud_async.claim_ai_summary(db, row.id, current, LEASE_SECONDS):
+                        return "skipped"
+                started = time.perf_counter()
+                # No client-side retries: rate limits are handled here, across all workers
+                analysis = schemas.AIAnalysis(**await generate_startup_analysis(row, max_retries=0)).model_dump()
+            except Exception as e:
+                error = e
+                async with AsyncSessionLocal() as db:
+                    await crud_async.release_ai_summary(db, row.id)
+            else:
+                latencies.append(time.perf_counter() - started)
+                async with AsyncSessionLocal() as db:
+                    await crud_async.set_ai_summary(db, row.id, json.dumps(analysis), current)
+                return "generated"
+        finally:
+            rate_limited = isinstance(error, openai.RateLimitError)
+            await limiter.release(rate_limited, retry_after_seconds(error) if rate_limited else None)
+        if isinstance(error, openai.RateLimitError):
+            stats["rate_limited"] += 1
+        elif isinstance(error, TRANSIENT_ERRORS) and attempt < max_retries:
+            await asyncio.sleep(min(MAX_BACKOFF_SECONDS, 2 ** attempt))
+        else:
+            break
+    print(f"Error analyzing startup {row.id}: {error}")
+    return "failed"
+
+
+async def warm_analyses(concurrency: int = 8, limit: Optional[int] = None, max_retries: int = 5,
+                        checkpoint_path: Optional[str] = CHECKPOINT_PATH, progress_every: int = 100,
+                        stop: Optional[asyncio.Event] = None) -> dict:
+    """Generate the AI analysis of every startup whose analysis is missing or stale.
+
+    Calls run `concurrency` at a time, fewer while the API is rate-limiting. Progress is
+    checkpointed to `checkpoint_path` (None to disable) as the highest startup id below
+    which every startup is done, so an interrupted run resumes where it stopped; startups
+    that failed are retried by the next full run. Setting `stop` ends the run early once
+    the generations in flight finish (cancelling could interrupt their database writes).
+    Returns counts, token usage, estimated
+    cost and generation latency, for this run and (under "total") since the first
+    checkpoint of an interrupted run.
+    """
+    state = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    resumed_after = state["last_id"] if state else 0
+    previous = state["totals"] if state else {**dict.fromkeys(COUNTERS, 0), "seconds": 0.0}
+    if state:
+        print(f"Resuming analysis warm-up after startup {resumed_after}")
+
+    stats = dict.fromkeys(COUNTERS, 0)
+    latencies: List[float] = []
+    limiter = AdaptiveLimiter(concurrency)
+    stop = stop or asyncio.Event()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    dispatched: deque = deque()  # ids in dispatch (= id) order, until the watermark passes them
+    finished = set()
+    watermark = resumed_after
+    scanned = False  # every pending startup was dispatched, not just up to `limit`
+    usage_before = dict(token_usage.get(ANALYSIS_MODEL, {}))
+    started = time.perf_counter()
+
+    def snapshot() -> dict:
+        usage = token_usage.get(ANALYSIS_MODEL, {})
+        for key in ("prompt_tokens", "completion_tokens"):
+            stats[key] = usage.get(key, 0) - usage_before.get(key, 0)
+        run = {**stats, "seconds": round(time.perf_counter() - started, 3)}
+        return {key: round(previous.get(key, 0) + run[key], 3) for key in run}
+
+    def checkpoint(finished_run: bool = False):
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, {"last_id": watermark, "finished": finished_run,
+                                              "totals": snapshot(), "updated_at": time.time()})
+
+    async def produce():
+        nonlocal scanned
+        count = 0
+        async for row, current in iter_pending(resumed_after):
+            if stop.is_set() or limit is not None and count >= limit:
+                break
+            dispatched.append(row.id)
+            await queue.put((row, current))
+            count += 1
+        else:
+            scanned = True
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        nonlocal watermark
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            row, current = item
+            if stop.is_set():
+                continue  # drain the queue without starting new generations
+            stats[await warm_one(row, current, limiter, stats, latencies, max_retries)] += 1
+            finished.add(row.id)
+            while dispatched and dispatched[0] in finished:
+                watermark = dispatched.popleft()
+                finished.discard(watermark)
+            done = stats["generated"] + stats["failed"] + stats["skipped"]
+            if done % CHECKPOINT_EVERY == 0:
+                checkpoint()
+            if progress_every and done % progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"Analyzed {done} startups ({stats['failed']} failed, {stats['rate_limited']} rate-limited, "
+                      f"concurrency {limiter.limit}) in {elapsed:.0f}s ({done / elapsed:.1f}/s)")
+
+    tasks = [asyncio.ensure_future(produce()), *(asyncio.ensure_future(work()) for _ in range(concurrency))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Let the other workers finish what they started, then save what is done to resume from
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        checkpoint()
+        raise
+    # Stopped early (`limit` or `stop`), the run stays resumable; a complete one lets the next run start over
+    checkpoint(finished_run=scanned)
+
+    total = snapshot()
+    seconds = round(time.perf_counter() - started, 3)
+    ms = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else [0.0, 0.0, 0.0]
+    result = {
+        **stats,
+        "cost_usd": cost_usd(stats["prompt_tokens"], stats["completion_tokens"]),
+        "seconds": seconds,
+        "per_second": round(stats["generated"] / seconds, 2) if seconds else 0.0,
+        "latency_p50_ms": round(float(ms[0]), 1),
+        "latency_p95_ms": round(float(ms[1]), 1),
+        "latency_p99_ms": round(float(ms[2]), 1),
+        "final_concurrency": limiter.limit,
+    }
+    if state:
+        result["total"] = {**total, "cost_usd": cost_usd(total["prompt_tokens"], total["completion_tokens"])}
+    return result
+
+
+def stop_on_signals() -> asyncio.Event:
+    """Event set by Ctrl-C or SIGTERM (e.g. from a scheduler), so the job checkpoints and exits; a second signal aborts"""
+    stop = asyncio.Event()
+    task = asyncio.current_task()
+
+    def handle():
+        if stop.is_set():
+            task.cancel()
+        else:
+            print("Stopping after the analyses in flight (signal again to abort)")
+            stop.set()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, handle)
+    return stop
+
+
+async def run_once(**kwargs) -> dict:
+    """One warm-up outside the server, closing the async engines so the process can exit"""
+    stop = stop_on_signals()
+    try:
+        return await warm_analyses(stop=stop, **kwargs)
+    finally:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+
+
+async def run_scheduled(every: float, **kwargs):
+    """Run the warm-up every `every` seconds, e.g. to pick up startups added by imports.
+
+    Stays in one event loop, which the shared API client and database engines are bound to.
+    """
+    stop = stop_on_signals()
+    try:
+        while not stop.is_set():
+            print(f"Analysis warm-up: {await warm_analyses(stop=stop, **kwargs)}")
+            try:
+                await asyncio.wait_for(stop.wait(), every)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate AI analyses for startups whose analysis is missing or stale")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum generations in flight")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many startups (resumable)")
+    parser.add_argument("--retries", type=int, default=5, help="retries per startup when rate-limited")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="progress file for resuming an interrupted run")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and scan from the first startup")
+    parser.add_argument("--every", type=float, default=None, help="keep running, every N seconds")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible API base URL (e.g. a local stub)")
+    args = parser.parse_args()
+
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url  # read when the shared client is created
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    from backend.database import engine
+    from backend.migrations import run_migrations
+
+    run_migrations(engine)
+    options = dict(concurrency=args.concurrency, limit=args.limit, max_retries=args.retries, checkpoint_path=args.checkpoint)
+    if args.every:
+        asyncio.run(run_scheduled(args.every, **options))
+    else:
+        print(json.dumps(asyncio.run(run_once(**options)), indent=2))
@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.embedding_providers import embedding_provider
+from backend.embedding_store import decode_embedding
+from backend.models import Startup
+
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", "ann_index")  # directory holding the persisted index
+ANN_PROBES = int(os.getenv("ANN_PROBES", "8"))  # inverted lists scanned per query
+SIMILARITY_BACKEND = os.getenv("SIMILARITY_BACKEND", "exact")  # "exact" or "ivf"
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 256  # training rows per list when fitting centroids
+RECONCILE_REBUILD_FRACTION = 0.1  # on load, rebuild instead of patching the delta when more than this share changed
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, iterations: int = KMEANS_ITERATIONS,
+                    seed: int = 0, chunk_size: int = 65536) -> np.ndarray:
+    """Spherical k-means on a sample of L2-normalized vectors"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids, chunk_size)
+        counts = np.bincount(assignments, minlength=n_lists)
+        # Per-list sums via one sort + reduceat (much faster than np.add.at)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        nonempty = counts > 0
+        sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+        empty = ~nonempty
+        if empty.any():
+            # Re-seed empty lists from random sample rows
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Index of the nearest centroid for every row, computed in chunks to bound memory"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        assignments[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+    return assignments
+
+
+class IVFIndex:
+    """Inverted-file ANN index over startup embeddings, persisted as memory-mappable .npy files.
+
+    Rows are stored sorted by (list, sector), so a sector-filtered query reads one
+    contiguous slice per probed list instead of scanning the catalog. Startups embedded
+    after the last build go into a small in-memory delta that is searched exactly; it is
+    not saved, so reconcile_with_db recreates it from the database after a load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.bounds = np.zeros(1, dtype=np.int64)  # row range of (list l, sector s) is bounds[l*S+s]:bounds[l*S+s+1]
+        self.sectors: List[str] = []  # the base build's sectors; bounds are laid out over these
+        self._sector_lookup = {}  # sector -> code, including codes past len(sectors) for delta-only sectors
+        self._removed = set()  # base rows superseded by the delta or deleted
+        self._delta = {}  # startup_id -> (normalized vector, sector code)
+        self.built_at = 0.0  # unix timestamp of the database snapshot the base was built from
+
+    @property
+    def ready(self) -> bool:
+        return len(self.centroids) > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            removed = np.fromiter(self._removed, dtype=np.int64, count=len(self._removed))
+            delta = len(self._delta)
+        return int(len(self.ids) - np.isin(self.ids, removed).sum() + delta)
+
+    def build(self, vectors: np.ndarray, ids: np.ndarray, sectors: List[str], n_lists: Optional[int] = None,
+              iterations: int = KMEANS_ITERATIONS, seed: int = 0):
+        """Cluster `vectors` (one row per id, with each row's sector name) into inverted lists"""
+        vectors = _normalize_rows(vectors)
+        ids = np.asarray(ids, dtype=np.int64)
+        vocab, sector_codes = np.unique(np.array(sectors, dtype=object), return_inverse=True)
+        n_lists = max(1, min(n_lists or int(np.sqrt(len(ids))), len(ids)))
+
+        centroids = train_centroids(vectors, n_lists, iterations, seed)
+        assignments = assign_lists(vectors, centroids)
+        order = np.lexsort((sector_codes, assignments))
+        n_sectors = len(vocab)
+        counts = np.bincount(assignments.astype(np.int64) * n_sectors + sector_codes, minlength=n_lists * n_sectors)
+        bounds = np.zeros(n_lists * n_sectors + 1, dtype=np.int64)
+        np.cumsum(counts, out=bounds[1:])
+
+        with self._lock:
+            self.centroids = centroids
+            self.vectors = np.ascontiguousarray(vectors[order])
+            self.ids = ids[order]
+            self.bounds = bounds
+            self.sectors = list(vocab)
+            self._sector_lookup = {sector: i for i, sector in enumerate(self.sectors)}
+            self._removed = set()
+            self._delta = {}
+            self.built_at = time.time()
+
+    def save(self, path: str = ANN_INDEX_PATH, model: Optional[str] = None):
+        """Write the base index to `path`; the delta is not persisted (see reconcile_with_db)"""
+        os.makedirs(path, exist_ok=True)
+        for name in ("centroids", "vectors", "ids", "bounds"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"sectors": self.sectors, "count": int(len(self.ids)), "built_at": self.built_at,
+                       "model": model or embedding_provider.name}, f)
+
+    def load(self, path: str = ANN_INDEX_PATH, model: Optional[str] = None) -> bool:
+        """Memory-map a saved index; returns False if there is none at `path` or it holds another model's vectors"""
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("model") != (model or embedding_provider.name):
+            return False
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in ("centroids", "vectors", "ids", "bounds")}
+        with self._lock:
+            self.centroids = np.array(arrays["centroids"])  # small, searched on every query
+            self.vectors = arrays["vectors"]
+            self.ids = np.array(arrays["ids"])
+            self.bounds = np.array(arrays["bounds"])
+            self.sectors = meta["sectors"]
+            self._sector_lookup = {sector: i for i, sector in enumerate(self.sectors)}
+            self._removed = set()
+            self._delta = {}
+            self.built_at = meta.get("built_at", 0.0)
+        return True
+
+    def upsert(self, startup_id: int, vector, sector: Optional[str] = None):
+        """Add or replace one startup without rebuilding"""
+        v = _normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            if self.ready and v.size != self.centroids.shape[1]:
+                raise ValueError(f"Embedding dimension {v.size} does not match index dimension {self.centroids.shape[1]}")
+            code = self._sector_lookup.setdefault(sector, len(self._sector_lookup))
+            self._removed.add(startup_id)
+            self._delta[startup_id] = (v, code)
+
+    def remove(self, startup_id: int):
+        with self._lock:
+            self._removed.add(startup_id)
+            self._delta.pop(startup_id, None)
+
+    def _ranges(self, lists: np.ndarray, sector_code: Optional[int]) -> List[Tuple[int, int]]:
+        n_sectors = len(self.sectors)
+        if sector_code is None:
+            return [(int(self.bounds[l * n_sectors]), int(self.bounds[(l + 1) * n_sectors])) for l in lists]
+        return [(int(self.bounds[l * n_sectors + sector_code]), int(self.bounds[l * n_sectors + sector_code + 1])) for l in lists]
+
+    def search(self, vector, limit: int = 3, n_probe: int = ANN_PROBES, sector: Optional[str] = None,
+               exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Approximate top `limit` (startup_id, cosine similarity), optionally within one sector.
+
+        Probes the `n_probe` nearest lists, doubling the probe count while filters leave
+        fewer than `limit` results.
+        """
+        if not self.ready or limit <= 0:
+            return []
+        query = _normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            removed = np.fromiter(self._removed, dtype=np.int64, count=len(self._removed))
+            delta = list(self._delta.items())
+            sector_code = None if sector is None else self._sector_lookup.get(sector, -1)
+        excluded = np.fromiter(set(exclude), dtype=np.int64)
+        dropped = np.concatenate([removed, excluded])
+
+        # Delta rows are few, so they are always scanned exactly
+        delta_ids, delta_scores = [], []
+        for startup_id, (v, code) in delta:
+            if (sector_code is None or code == sector_code) and startup_id not in excluded:
+                delta_ids.append(startup_id)
+                delta_scores.append(float(v @ query))
+
+        centroid_scores = self.centroids @ query
+        n_lists = len(self.centroids)
+        probes = min(max(1, n_probe), n_lists)
+        while True:
+            lists = np.argpartition(-centroid_scores, probes - 1)[:probes] if probes < n_lists else np.arange(n_lists)
+            ids, scores = list(delta_ids), list(delta_scores)
+            # Sectors first seen after the build (or unknown ones, -1) have no base rows
+            if sector_code is None or 0 <= sector_code < len(self.sectors):
+                for start, end in self._ranges(lists, sector_code):
+                    if start == end:
+                        continue
+                    row_ids = self.ids[start:end]
+                    keep = ~np.isin(row_ids, dropped) if dropped.size else slice(None)
+                    ids.extend(row_ids[keep].tolist())
+                    scores.extend((self.vectors[start:end] @ query)[keep].tolist())
+            if len(ids) >= limit or probes >= n_lists:
+                break
+            probes = min(probes * 2, n_lists)
+
+        if not ids:
+            return []
+        scores = np.asarray(scores, dtype=np.float32)
+        k = min(limit, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+ann_index = IVFIndex()
+
+
+def build_from_db(db, n_lists: Optional[int] = None, path: str = ANN_INDEX_PATH,
+                  index: Optional[IVFIndex] = None, model: Optional[str] = None) -> IVFIndex:
+    """Build the IVF index (a new one unless `index` is given) from the stored embeddings of
+    `model` (default: the configured provider) and persist it"""
+    model = model or embedding_provider.name
+    started = time.time()  # rows written after this may be missed, so reconcile treats them as changed
+    rows = (
+        db.query(Startup.id, Startup.sector, Startup.embedding, Startup.embedding_dtype, Startup.embedding_dim)
+        .filter(Startup.embedding.isnot(None), Startup.embedding_model == model)
+        .yield_per(1000)
+    )
+    ids, sectors, vectors = [], [], []
+    for startup_id, sector, blob, dtype, dim in rows:
+        ids.append(startup_id)
+        sectors.append(sector)
+        vectors.append(decode_embedding(blob, dtype, dim))
+    if index is None:
+        index = IVFIndex()
+    if ids:
+        index.build(np.vstack(vectors), np.asarray(ids), sectors, n_lists=n_lists)
+        index.built_at = started
+        index.save(path, model)
+    return index
+
+
+def reconcile_with_db(db, index: IVFIndex, model: Optional[str] = None, batch_size: int = 500) -> dict:
+    """Bring a loaded index up to date with the stored embeddings of `model`.
+
+    Startups missing from the index or embedded after it was built are upserted into the
+    delta; indexed ones whose embedding is gone (deleted, or cleared for re-embedding) are removed.
+    """
+    model = model or embedding_provider.name
+    rows = (
+        db.query(Startup.id, Startup.embedded_at)
+        .filter(Startup.embedding.isnot(None), Startup.embedding_model == model)
+        .all()
+    )
+    stored = np.fromiter((startup_id for startup_id, _ in rows), dtype=np.int64, count=len(rows))
+    missing = set(np.setdiff1d(stored, index.ids).tolist())
+    changed = {startup_id for startup_id, embedded_at in rows if embedded_at is not None and embedded_at > index.built_at}
+    gone = np.setdiff1d(index.ids, stored).tolist()
+
+    for startup_id in gone:
+        index.remove(startup_id)
+    stale = sorted(missing | changed)
+    for start in range(0, len(stale), batch_size):
+        for startup_id, sector, blob, dtype, dim in (
+            db.query(Startup.id, Startup.sector, Startup.embedding, Startup.embedding_dtype, Startup.embedding_dim)
+            .filter(Startup.id.in_(stale[start:start + batch_size]))
+        ):
+            index.upsert(startup_id, decode_embedding(blob, dtype, dim), sector)
+    return {"added": len(missing), "updated": len(changed - missing), "removed": len(gone)}
+
+
+def load_or_build(db, index: IVFIndex = ann_index, path: str = ANN_INDEX_PATH, model: Optional[str] = None) -> IVFIndex:
+    """Load the saved index and reconcile it with the database, rebuilding if there is
+    none or more than RECONCILE_REBUILD_FRACTION of it changed since the build"""
+    if index.load(path, model):
+        changes = reconcile_with_db(db, index, model)
+        if sum(changes.values()) <= RECONCILE_REBUILD_FRACTION * len(index.ids):
+            if any(changes.values()):
+                print(f"Reconciled the similarity index with the database: {changes}")
+            return index
+        print(f"Rebuilding the similarity index, too much changed since it was saved: {changes}")
+    return build_from_db(db, path=path, index=index, model=model)
+
+
+def exact_search(matrix: np.ndarray, ids: np.ndarray, query: np.ndarray, limit: int) -> List[int]:
+    """Brute-force top-k ids, the ground truth for benchmarks"""
+    scores = matrix @ query
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    return ids[top[np.argsort(-scores[top])]].tolist()
+
+
+def benchmark(n: int = 100000, dim: int = 64, n_queries: int = 200, limit: int = 10, n_sectors: int = 11,
+              n_lists: Optional[int] = None, probes: Iterable[int] = (1, 4, 8, 16, 32), seed: int = 0):
+    """Recall@limit and latency of the IVF index against exact search on clustered synthetic data"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 500), dim)).astype(np.float32)
+    matrix = _normalize_rows(centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32))
+    ids = np.arange(1, n + 1, dtype=np.int64)
+    sectors = [f"sector-{i}" for i in rng.integers(0, n_sectors, n)]
+    queries = matrix[rng.choice(n, n_queries, replace=False)] + 0.1 * rng.normal(size=(n_queries, dim)).astype(np.float32)
+    queries = _normalize_rows(queries)
+
+    started = time.perf_counter()
+    index = IVFIndex()
+    index.build(matrix, ids, sectors, n_lists=n_lists)
+    print(f"Built {len(index.centroids)} lists over {n} vectors (dim {dim}) in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    truth = [exact_search(matrix, ids, q, limit) for q in queries]
+    exact_ms = 1000 * (time.perf_counter() - started) / n_queries
+    print(f"{'method':<18}{'recall@' + str(limit):>12}{'ms/query':>12}")
+    print(f"{'exact':<18}{1.0:>12.3f}{exact_ms:>12.3f}")
+
+    target_sector = sectors[0]
+    in_sector = np.array([s == target_sector for s in sectors])
+    sector_truth = [exact_search(matrix[in_sector], ids[in_sector], q, limit) for q in queries]
+
+    for n_probe in probes:
+        for label, expected, sector in (("ivf", truth, None), ("ivf+sector", sector_truth, target_sector)):
+            started = time.perf_counter()
+            found = [[i for i, _ in index.search(q, limit, n_probe=n_probe, sector=sector)] for q in queries]
+            ms = 1000 * (time.perf_counter() - started) / n_queries
+            recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, expected)])
+            print(f"{label + ' p=' + str(n_probe):<18}{recall:>12.3f}{ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the IVF similarity index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="build from stored embeddings and save to --path")
+    build_parser.add_argument("--lists", type=int, default=None, help="inverted lists (default sqrt(N))")
+    build_parser.add_argument("--path", default=ANN_INDEX_PATH)
+    bench_parser = subparsers.add_parser("bench", help="recall/latency against exact search on synthetic data")
+    bench_parser.add_argument("--n", type=int, default=100000)
+    bench_parser.add_argument("--dim", type=int, default=64)
+    bench_parser.add_argument("--queries", type=int, default=200)
+    bench_parser.add_argument("--lists", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from backend.database import SessionLocal, engine
+        from backend.migrations import run_migrations
+
+        run_migrations(engine)
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            index = build_from_db(db, n_lists=args.lists, path=args.path)
+        finally:
+            db.close()
+        print(f"Indexed {len(index)} startups in {len(index.centroids)} lists "
+              f"in {time.perf_counter() - started:.2f}s -> {args.path}")
+    else:
+        benchmark(n=args.n, dim=args.dim, n_queries=args.queries, n_lists=args.lists)
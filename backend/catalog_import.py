@@ -0,0 +1,173 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from typing import Iterator, List, Union
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, case, inspect, literal_column, or_, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from backend import schemas
+from backend.crud import rebuild_analytics_summary
+from backend.database import engine
+from backend.deck_cache import deck_cache
+from backend.models import Startup, split_location
+from backend.response_cache import response_cache
+from backend.scoring import scoring_engine
+from backend.search_index import drop_sync_triggers, ensure_search_index
+
+BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH_SIZE", "5000"))  # rows per INSERT ... ON CONFLICT transaction
+MAX_REPORTED_ERRORS = 10
+NAME_INDEX = "ux_startups_name"
+
+PROFILE_COLUMNS = tuple(schemas.StartupBase.model_fields)
+INSERT_COLUMNS = PROFILE_COLUMNS + ("city", "state")
+EMBEDDED_COLUMNS = ("sector", "description", "location", "funding_stage")  # besides name, what the embedding text uses
+EMBEDDING_COLUMNS = ("embedding", "embedding_dim", "embedding_dtype", "embedding_model", "embedded_at")
+
+
+def read_dataset(path: str) -> Iterator[Union[dict, str]]:
+    """Stream a .csv or .jsonl dataset (optionally gzipped) one row at a time.
+
+    CSV rows come out as dicts, JSONL rows as raw lines for the caller to parse.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    name = path[:-3] if path.endswith(".gz") else path
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if name.endswith(".csv"):
+            yield from csv.DictReader(f)
+        elif name.endswith((".jsonl", ".ndjson")):
+            yield from (line for line in f if line.strip())
+        else:
+            raise ValueError(f"Unsupported dataset format: {path} (expected .csv or .jsonl)")
+
+
+def validate_row(raw: Union[dict, str]) -> dict:
+    """Column values for one startup row; raises ValueError (or ValidationError) if it is invalid"""
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    else:
+        raw = {key: (value if value != "" else None) for key, value in raw.items()}
+    row = schemas.StartupBase.model_validate(raw).model_dump()
+    row["city"], row["state"] = split_location(row["location"])
+    return row
+
+
+def upsert_statement():
+    """INSERT ... ON CONFLICT (name) DO UPDATE, touching only rows whose profile changed.
+
+    A changed sector, description, location or stage also clears the stored
+    embedding so the backfill re-embeds the new text.
+    """
+    statement = insert(Startup).values({
+        **{column: bindparam(column) for column in INSERT_COLUMNS},
+        "user_interest_score": literal_column("0"),
+        "is_saved": literal_column("0"),
+    })
+    excluded = statement.excluded
+    changed = or_(*(
+        getattr(Startup, column).is_distinct_from(getattr(excluded, column)) for column in PROFILE_COLUMNS if column != "name"
+    ))
+    re_embed = or_(*(getattr(Startup, column).is_distinct_from(getattr(excluded, column)) for column in EMBEDDED_COLUMNS))
+    updates = {column: getattr(excluded, column) for column in INSERT_COLUMNS if column != "name"}
+    updates.update({column: case((re_embed, None), else_=getattr(Startup, column)) for column in EMBEDDING_COLUMNS})
+    return statement.on_conflict_do_update(index_elements=[Startup.name], set_=updates, where=changed)
+
+
+# Compiled once: executemany over plain tuples skips per-row parameter processing
+_UPSERT = upsert_statement().compile(dialect=sqlite.dialect())
+_UPSERT_SQL = str(_UPSERT)
+
+
+def write_batch(bind, rows: List[dict]) -> tuple:
+    """Upsert one batch in a single transaction; returns (inserted, updated)"""
+    with bind.begin() as conn:
+        existing = len(conn.execute(select(Startup.name).where(Startup.name.in_({row["name"] for row in rows}))).all())
+        params = [tuple(row[column] for column in _UPSERT.positiontup) for row in rows]
+        written = conn.exec_driver_sql(_UPSERT_SQL, params).rowcount
+    inserted = len({row["name"] for row in rows}) - existing
+    return inserted, max(0, written - inserted)
+
+
+def import_catalog(path: str, batch_size: int = BATCH_SIZE, bind=engine, progress_every: int = 0) -> dict:
+    """Stream a startup dataset into the catalog in batched upserts, in bounded memory.
+
+    Rows are matched to existing startups by name. Invalid rows are counted and skipped.
+    """
+    stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0}
+    started = time.perf_counter()
+    batch = []
+    with bind.connect() as conn:
+        if NAME_INDEX not in {index["name"] for index in inspect(conn).get_indexes(Startup.__tablename__)}:
+            raise RuntimeError(f"Imports match startups by name and need the unique {NAME_INDEX} index, "
+                               "which migrations skip while startup names are duplicated")
+        initial_load = conn.execute(select(Startup.id).limit(1)).first() is None
+    if initial_load:
+        # Index the whole load in one pass at the end rather than row by row
+        drop_sync_triggers(bind)
+
+    def flush():
+        inserted, updated = write_batch(bind, batch)
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        stats["unchanged"] += len(batch) - inserted - updated
+        batch.clear()
+
+    try:
+        for line_number, raw in enumerate(read_dataset(path), start=1):
+            stats["rows"] += 1
+            try:
+                batch.append(validate_row(raw))
+            except (ValueError, ValidationError) as e:
+                stats["invalid"] += 1
+                if stats["invalid"] <= MAX_REPORTED_ERRORS:
+                    print(f"Skipping row {line_number}: {' '.join(str(e).split())[:200]}")
+            if len(batch) >= batch_size:
+                flush()
+            if progress_every and stats["rows"] % progress_every == 0:
+                print(f"{stats['rows']} rows, {stats['rows'] / (time.perf_counter() - started):.0f} rows/s")
+        if batch:
+            flush()
+    finally:
+        if initial_load:
+            ensure_search_index(bind)
+
+    if stats["inserted"] or stats["updated"]:
+        db = Session(bind=bind)
+        try:
+            rebuild_analytics_summary(db)
+        finally:
+            db.close()
+        scoring_engine.invalidate()
+        response_cache.bump_catalog()
+        deck_cache.invalidate()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_s"] = round(stats["rows"] / stats["seconds"]) if stats["seconds"] else 0
+    return stats
+
+
+if __name__ == "__main__":
+    from backend.migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Import or refresh startups from a CSV or JSONL dataset")
+    parser.add_argument("path", help=".csv or .jsonl file, optionally gzipped")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--progress-every", type=int, default=100000, help="print throughput every N rows (0 to disable)")
+    parser.add_argument("--warm-analyses", action="store_true",
+                        help="then generate AI analyses for new and changed startups (see backend.analysis_warmup)")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+    print(import_catalog(args.path, batch_size=args.batch_size, progress_every=args.progress_every))
+    if args.warm_analyses:
+        import asyncio
+
+        from backend.analysis_warmup import run_once
+
+        print(asyncio.run(run_once()))
@@ -0,0 +1,12 @@
+import os
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./startupswipe.db")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL lets readers run alongside the writer
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # safe with WAL, far fewer fsyncs than FULL
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes of the file read via mmap
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))  # page cache per connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # wait this long on a locked database
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))  # read-only connections kept open
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "8"))
+DB_WRITE_POOL_TIMEOUT = float(os.getenv("DB_WRITE_POOL_TIMEOUT", "30"))  # seconds to wait for the writer connection
@@ -1,75 +1,446 @@
-from sqlalchemy.orm import Session
-from backend.models import Startup
-from typing import List, Optional
+import json
+import math
+import time
+from collections import Counter
 
-def get_startups(db: Session, limit: int = 10, offset: int = 0) -> List[Startup]:
-    """Get a list of startups for swiping"""
-    return db.query(Startup).filter(Startup.is_saved == False).offset(offset).limit(limit).all()
+from sqlalchemy import and_, case, exists, func, literal, or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, aliased
+from backend import search_index
+from backend.models import AnalyticsSummary, SectorGram, SectorSimilarity, Startup, SwipeEvent, UserPreference, UserSave, split_location
+from backend.preference_learning import LearnedProfile, preference_learner
+from backend.response_cache import response_cache
+from backend.scoring import LOCATION_WEIGHT, RISK_BANDS, RISK_WEIGHT, SIMILARITY_WEIGHT
+from typing import Iterable, List, Optional, Tuple
+
+def saved_by(user_id: str):
+    """SQL condition: the startup is in this user's saved list"""
+    return exists().where(UserSave.user_id == user_id, UserSave.startup_id == Startup.id)
+
+def get_startups(db: Session, user_id: str, limit: int = 10, offset: int = 0, after_id: Optional[int] = None) -> List[Startup]:
+    """Get a list of startups for swiping, keyset-paginated by id when after_id is given"""
+    query = db.query(Startup).filter(~saved_by(user_id))
+    if after_id is not None:
+        query = query.filter(Startup.id > after_id)
+    elif offset:
+        query = query.offset(offset)
+    return query.order_by(Startup.id).limit(limit).all()
+
+def personalized_rank_expression(cities: List[str], risk_tolerance: Optional[str], profile: Optional[LearnedProfile] = None):
+    """SQL mirror of the scoring engine's location and risk-band points, plus points learned from swipes"""
+    terms = []
+    if cities:
+        terms.append(case((Startup.city.in_(cities), LOCATION_WEIGHT), else_=0))
+    band = RISK_BANDS.get((risk_tolerance or "").lower())
+    if band:
+        low, high = band
+        conditions = []
+        if low != float("-inf"):
+            conditions.append(Startup.growth_rate > low)
+        if high != float("inf"):
+            conditions.append(Startup.growth_rate < high)
+        terms.append(case((and_(*conditions), RISK_WEIGHT), else_=0))
+    if profile is not None:
+        for dimension, column in (("sector", Startup.sector), ("funding_stage", Startup.funding_stage), ("city", Startup.city)):
+            points = profile.points(dimension)
+            if points:
+                terms.append(case(points, value=column, else_=0))
+        neighbors = profile.neighbor_points()
+        if neighbors:
+            terms.append(case(neighbors, value=Startup.id, else_=0))
+    return sum(terms[1:], terms[0]) if terms else literal(0)
+
+def get_personalized_startups(db: Session, user_id: str, sectors: List[str], stages: List[str], locations: List[str],
+                              risk_tolerance: Optional[str] = None, limit: int = 20, offset: int = 0,
+                              after: Optional[Tuple[float, float, int]] = None,
+                              profile: Optional[LearnedProfile] = None,
+                              exclude_ids: Iterable[int] = ()) -> List[Tuple[Startup, float]]:
+    """Filter by sector/stage/city in SQL (indexed) and return one ranked page of (startup, rank).
+    
+    The rank is personalized_rank_expression plus the stored similarity of each candidate
+    to `sectors` (join_similarity), so ranking and paging stay in SQL. `after` is the
+    (rank, growth_rate, id) of the previous page's last row. With a learned `profile`,
+    sectors and stages the user has been swiping right on join the filters too.
+    Startups in `exclude_ids` are left out.
+    """
+    interests = list(sectors)
+    if profile is not None:
+        sectors = sectors and sorted(set(sectors) | {v for v, p in profile.points("sector").items() if p > 0})
+        stages = stages and sorted(set(stages) | {v for v, p in profile.points("funding_stage").items() if p > 0})
+    query = db.query(Startup).filter(~saved_by(user_id))
+    exclude_ids = list(exclude_ids)
+    if exclude_ids:
+        query = query.filter(Startup.id.notin_(exclude_ids))
+    if sectors:
+        query = query.filter(Startup.sector.in_(sectors))
+    if stages:
+        query = query.filter(Startup.funding_stage.in_(stages))
+    
+    # Location narrows the results only when something actually matches
+    cities = [city for city, _ in map(split_location, locations) if city]
+    if cities:
+        located = query.filter(Startup.city.in_(cities))
+        if db.query(located.exists()).scalar():
+            query = located
+    
+    rank = personalized_rank_expression(cities, risk_tolerance, profile)
+    query, similarity = join_similarity(db, query, interests)
+    if similarity is not None:
+        rank = rank + SIMILARITY_WEIGHT * similarity
+    query = query.add_columns(rank.label("rank")).order_by(rank.desc(), Startup.growth_rate.desc(), Startup.id)
+    if after is not None:
+        last_rank, last_growth, last_id = after
+        query = query.filter(or_(
+            rank < last_rank,
+            and_(rank == last_rank, Startup.growth_rate < last_growth),
+            and_(rank == last_rank, Startup.growth_rate == last_growth, Startup.id > last_id),
+        ))
+    elif offset:
+        query = query.offset(offset)
+    return [(startup, float(startup_rank)) for startup, startup_rank in query.limit(limit).all()]
+
+def join_similarity(db: Session, query, sectors: List[str]):
+    """Join the stored sector similarities onto a Startup query; returns (query, similarity expression).
+
+    SQL mirror of the scoring engine's similarity term (0 to 1) for a user following `sectors`:
+    the sum of the startup's dot products with the sectors' centroids over the norm of their
+    mean. The expression is None when nothing is stored for these sectors.
+    """
+    sectors = sorted(set(sectors))
+    gram = sectors and db.query(func.sum(SectorGram.dot)).filter(
+        SectorGram.sector.in_(sectors), SectorGram.other_sector.in_(sectors)
+    ).scalar()
+    if not gram or gram <= 0:
+        return query, None
+    dots = []
+    for i, sector in enumerate(sectors):
+        stored = aliased(SectorSimilarity, name=f"similarity_{i}")
+        query = query.outerjoin(stored, and_(stored.sector == sector, stored.startup_id == Startup.id))
+        dots.append(func.coalesce(stored.similarity, 0.0))
+    return query, func.max(0.0, func.min(1.0, sum(dots[1:], dots[0]) / math.sqrt(gram)))
+
+def get_ranked_startups_for_user(db: Session, user_id: str, preferences: dict, limit: int = 20, offset: int = 0,
+                                 after: Optional[Tuple[float, float, int]] = None,
+                                 exclude_ids: Iterable[int] = ()) -> List[Tuple[Startup, float]]:
+    """One ranked page for a user's onboarding preferences plus what they have learned from swipes"""
+    return get_personalized_startups(
+        db,
+        user_id,
+        sectors=preferences.get("selected_sectors", []),
+        stages=preferences.get("investment_stage", []),
+        locations=preferences.get("preferred_locations", []),
+        risk_tolerance=preferences.get("risk_tolerance"),
+        limit=limit,
+        offset=offset,
+        after=after,
+        profile=preference_learner.get(db, user_id),
+        exclude_ids=exclude_ids,
+    )
+
+def set_ai_summary(db: Session, startup_id: int, summary: str, profile_hash: str):
+    """Store a generated AI analysis (JSON string) and release the pending claim"""
+    db.query(Startup).filter(Startup.id == startup_id).update({
+        Startup.ai_summary: summary,
+        Startup.ai_summary_hash: profile_hash,
+        Startup.ai_summary_status: None,
+        Startup.ai_summary_lease_until: None,
+    }, synchronize_session=False)
+    db.commit()
+    response_cache.bump_catalog()
+
+def claim_ai_summary(db: Session, startup_id: int, profile_hash: str, lease_seconds: float) -> bool:
+    """Mark a startup's analysis pending for this worker; False if it is current or another worker holds it"""
+    now = time.time()
+    claimed = db.query(Startup).filter(
+        Startup.id == startup_id,
+        or_(Startup.ai_summary.is_(None), Startup.ai_summary_hash.is_distinct_from(profile_hash)),
+        or_(Startup.ai_summary_status.is_distinct_from("pending"), Startup.ai_summary_lease_until < now),
+    ).update({
+        Startup.ai_summary_status: "pending",
+        Startup.ai_summary_lease_until: now + lease_seconds,
+    }, synchronize_session=False)
+    db.commit()
+    return bool(claimed)
+
+def release_ai_summary(db: Session, startup_id: int):
+    """Drop a pending claim after a failed generation so the next request retries"""
+    db.query(Startup).filter(Startup.id == startup_id, Startup.ai_summary_status == "pending").update({
+        Startup.ai_summary_status: None,
+        Startup.ai_summary_lease_until: None,
+    }, synchronize_session=False)
+    db.commit()
 
 def get_startup_by_id(db: Session, startup_id: int) -> Optional[Startup]:
     """Get a single startup by ID"""
     return db.query(Startup).filter(Startup.id == startup_id).first()
 
-def save_startup(db: Session, startup_id: int) -> Optional[Startup]:
-    """Mark a startup as saved"""
+def filter_startups(query, stages: Optional[List[str]] = None, min_valuation: Optional[float] = None,
+                    max_valuation: Optional[float] = None, min_growth: Optional[float] = None,
+                    max_growth: Optional[float] = None):
+    """Apply the search filters (stage, valuation and growth ranges) to a query over Startup"""
+    if stages:
+        query = query.filter(Startup.funding_stage.in_(stages))
+    for column, low, high in ((Startup.valuation, min_valuation, max_valuation), (Startup.growth_rate, min_growth, max_growth)):
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+    return query
+
+def search_startups(db: Session, query: str, prefix: bool = True, limit: int = 20,
+                    after: Optional[Tuple[float, int]] = None, match_all: bool = True, **filters) -> List[Tuple[Startup, float]]:
+    """Full-text search over name, description, sector and location, best BM25 match first.
+    
+    Returns one page of (startup, rank) where lower ranks are better; `after` is the
+    (rank, id) of the previous page's last row. `filters` are those of filter_startups.
+    With `prefix` (typeahead) only rows whose name matches plus the first TYPEAHEAD_CANDIDATES
+    other matches are ranked, so a one- or two-letter prefix matching most of the catalog
+    still answers in milliseconds without losing the name hits that rank best.
+    `match_all=False` matches any word, minus words too common to rank within ANY_WORD_BUDGET.
+    """
+    words = search_index.query_words(query, match_all=match_all)
+    if not match_all:
+        words = search_index.drop_common_words(db, words)
+    expression = search_index.match_expression(words, prefix=prefix, match_all=match_all)
+    if expression is None:
+        return []
+    def matching(expression: str):
+        return filter_startups(
+            db.query(Startup.id.label("id"))
+            .select_from(search_index.fts)
+            .join(Startup, Startup.id == search_index.fts.c.rowid)
+            .filter(search_index.matches(expression)),
+            **filters,
+        )
+
+    candidates = matching(expression).add_columns(search_index.bm25().label("rank"))
+    if expression.endswith("*"):
+        name_hits = matching(search_index.in_column("name", expression))
+        others = matching(expression).limit(search_index.TYPEAHEAD_CANDIDATES)
+        candidates = candidates.filter(or_(Startup.id.in_(name_hits.statement), Startup.id.in_(others.statement)))
+    elif not match_all:
+        candidates = candidates.limit(search_index.ANY_WORD_BUDGET)  # only bites when even the rarest word is common
+    candidates = candidates.subquery()
+    
+    results = db.query(Startup, candidates.c.rank).join(candidates, candidates.c.id == Startup.id)
+    if after is not None:
+        last_rank, last_id = after
+        results = results.filter(or_(candidates.c.rank > last_rank, and_(candidates.c.rank == last_rank, Startup.id > last_id)))
+    return [
+        (startup, float(rank))
+        for startup, rank in results.order_by(candidates.c.rank, Startup.id).limit(limit).all()
+    ]
+
+def save_startup(db: Session, user_id: str, startup_id: int) -> Optional[Startup]:
+    """Add a startup to the user's saved list"""
     startup = db.query(Startup).filter(Startup.id == startup_id).first()
     if startup:
-        startup.is_saved = True
+        _add_save(db, user_id, startup)
         db.commit()
-        db.refresh(startup)
+        response_cache.bump_user(user_id)
     return startup
 
-def unsave_startup(db: Session, startup_id: int) -> bool:
-    """Remove a startup from saved"""
+def _add_save(db: Session, user_id: str, startup: Startup):
+    statement = insert(UserSave).values(user_id=user_id, startup_id=startup.id, created_at=time.time())
+    if db.execute(statement.on_conflict_do_nothing()).rowcount:
+        bump_analytics_summary(db, startup, saved=1)
+
+def unsave_startup(db: Session, user_id: str, startup_id: int) -> bool:
+    """Remove a startup from the user's saved list"""
     startup = db.query(Startup).filter(Startup.id == startup_id).first()
     if startup:
-        startup.is_saved = False
+        removed = (
+            db.query(UserSave)
+            .filter(UserSave.user_id == user_id, UserSave.startup_id == startup_id)
+            .delete(synchronize_session=False)
+        )
+        if removed:
+            bump_analytics_summary(db, startup, saved=-1)
         db.commit()
+        response_cache.bump_user(user_id)
         return True
     return False
 
-def get_saved_startups(db: Session) -> List[Startup]:
-    """Get all saved startups"""
-    return db.query(Startup).filter(Startup.is_saved == True).all()
-
-def get_sector_distribution(db: Session) -> dict:
-    """Get count of startups by sector"""
-    result = {}
-    startups = db.query(Startup).all()
-    for startup in startups:
-        if startup.sector in result:
-            result[startup.sector] += 1
-        else:
-            result[startup.sector] = 1
-    return result
-
-def get_avg_growth_by_sector(db: Session) -> dict:
-    """Get average growth rate by sector"""
-    result = {}
-    sector_totals = {}
-    sector_counts = {}
+def is_startup_saved(db: Session, user_id: str, startup_id: int) -> bool:
+    return db.get(UserSave, (user_id, startup_id)) is not None
+
+def count_saved_startups(db: Session, user_id: str) -> int:
+    return db.query(func.count(UserSave.startup_id)).filter(UserSave.user_id == user_id).scalar()
+
+def get_saved_startups(db: Session, user_id: str, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Startup]:
+    """Get the user's saved startups in id order, optionally one keyset page at a time"""
+    query = db.query(Startup).join(UserSave, UserSave.startup_id == Startup.id).filter(UserSave.user_id == user_id)
+    if after_id is not None:
+        query = query.filter(Startup.id > after_id)
+    query = query.order_by(Startup.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def record_swipe(db: Session, user_id: str, startup_id: int, direction: str) -> Optional[Startup]:
+    """Log a swipe; swiping right also saves the startup"""
+    startup = db.query(Startup).filter(Startup.id == startup_id).first()
+    if startup:
+        event = {"user_id": user_id, "startup_id": startup_id, "direction": direction, "created_at": time.time()}
+        db.add(SwipeEvent(**event))
+        if direction == "right":
+            _add_save(db, user_id, startup)
+        preference_learner.observe(db, [event], {startup_id: startup})
+        _commit_swipes(db, [user_id])
+    return startup
+
+def _commit_swipes(db: Session, user_ids: Iterable[str]):
+    try:
+        db.commit()
+    except Exception:
+        # The learner already applied these swipes in memory; reload its profiles from the database
+        db.rollback()
+        preference_learner.forget(user_ids)
+        raise
+    for user_id in user_ids:
+        response_cache.bump_user(user_id)
+
+def record_swipes_bulk(db: Session, events: List[dict]) -> List[dict]:
+    """Insert a batch of swipe events, plus the saves from right swipes, in one transaction.
     
-    startups = db.query(Startup).all()
-    for startup in startups:
-        if startup.sector not in sector_totals:
-            sector_totals[startup.sector] = 0
-            sector_counts[startup.sector] = 0
-        sector_totals[startup.sector] += startup.growth_rate
-        sector_counts[startup.sector] += 1
+    Each event is a dict of user_id, startup_id, direction and created_at. Events for
+    unknown startups are dropped; returns the events that were written.
+    """
+    startups = {
+        row.id: row for row in
+        db.query(Startup.id, Startup.sector, Startup.funding_stage, Startup.city).filter(Startup.id.in_({e["startup_id"] for e in events}))
+    }
+    events = [event for event in events if event["startup_id"] in startups]
+    if not events:
+        return []
+    db.execute(insert(SwipeEvent), events)
     
-    for sector in sector_totals:
-        result[sector] = sector_totals[sector] / sector_counts[sector]
+    right = {(e["user_id"], e["startup_id"]): e["created_at"] for e in events if e["direction"] == "right"}
+    if right:
+        existing = set(
+            db.query(UserSave.user_id, UserSave.startup_id)
+            .filter(UserSave.user_id.in_({user_id for user_id, _ in right}),
+                    UserSave.startup_id.in_({startup_id for _, startup_id in right}))
+            .all()
+        )
+        new_saves = [
+            {"user_id": user_id, "startup_id": startup_id, "created_at": created_at}
+            for (user_id, startup_id), created_at in right.items() if (user_id, startup_id) not in existing
+        ]
+        if new_saves:
+            db.execute(insert(UserSave).on_conflict_do_nothing(), new_saves)
+            saved = Counter()
+            for save in new_saves:
+                startup = startups[save["startup_id"]]
+                for dimension in SUMMARY_DIMENSIONS:
+                    saved[(dimension, getattr(startup, dimension))] += 1
+            statement = insert(AnalyticsSummary)
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[AnalyticsSummary.dimension, AnalyticsSummary.value],
+                    set_={"saved_count": AnalyticsSummary.saved_count + statement.excluded.saved_count},
+                ),
+                [
+                    {"dimension": dimension, "value": value, "startup_count": 0, "growth_total": 0.0, "saved_count": count}
+                    for (dimension, value), count in saved.items()
+                ],
+            )
+    preference_learner.observe(db, events, startups)
+    _commit_swipes(db, {event["user_id"] for event in events})
+    return events
+
+def get_swiped_startup_ids(db: Session, user_id: str) -> List[int]:
+    """Ids of every startup the user has swiped on, either way"""
+    return [startup_id for startup_id, in db.query(SwipeEvent.startup_id).filter(SwipeEvent.user_id == user_id).distinct()]
+
+def get_swipe_history(db: Session, user_id: str, limit: int = 50,
+                      before: Optional[Tuple[float, int]] = None) -> List[SwipeEvent]:
+    """The user's swipes, newest first; `before` is the (created_at, id) of the previous page's last event"""
+    query = db.query(SwipeEvent).filter(SwipeEvent.user_id == user_id)
+    if before is not None:
+        created_at, event_id = before
+        query = query.filter(or_(
+            SwipeEvent.created_at < created_at,
+            and_(SwipeEvent.created_at == created_at, SwipeEvent.id < event_id),
+        ))
+    return query.order_by(SwipeEvent.created_at.desc(), SwipeEvent.id.desc()).limit(limit).all()
+
+def save_user_preferences(db: Session, user_id: str, preferences: dict):
+    """Store (or replace) the user's onboarding preferences"""
+    statement = insert(UserPreference).values(user_id=user_id, preferences=json.dumps(preferences), updated_at=time.time())
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[UserPreference.user_id],
+        set_={"preferences": statement.excluded.preferences, "updated_at": statement.excluded.updated_at},
+    ))
+    db.commit()
+
+def get_user_preferences(db: Session, user_id: str) -> Optional[dict]:
+    row = db.get(UserPreference, user_id)
+    return json.loads(row.preferences) if row else None
+
+SUMMARY_DIMENSIONS = ("sector", "funding_stage")
+
+def bump_analytics_summary(db: Session, startup: Startup, saved: int):
+    """Adjust the saved counts for a startup's sector and stage by +/-1 in the caller's transaction.
+
+    Catalog changes go through rebuild_analytics_summary instead.
+    """
+    for dimension in SUMMARY_DIMENSIONS:
+        statement = insert(AnalyticsSummary).values(
+            dimension=dimension,
+            value=getattr(startup, dimension),
+            startup_count=0,
+            growth_total=0.0,
+            saved_count=saved,
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[AnalyticsSummary.dimension, AnalyticsSummary.value],
+            set_={"saved_count": AnalyticsSummary.saved_count + saved},
+        ))
+
+def rebuild_analytics_summary(db: Session) -> int:
+    """Recompute the summary table from startups in one GROUP BY scan"""
+    save_counts = (
+        db.query(UserSave.startup_id, func.count(UserSave.user_id).label("saves"))
+        .group_by(UserSave.startup_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            Startup.sector,
+            Startup.funding_stage,
+            func.count(Startup.id),
+            func.sum(Startup.growth_rate),
+            func.sum(func.coalesce(save_counts.c.saves, 0)),
+        )
+        .outerjoin(save_counts, save_counts.c.startup_id == Startup.id)
+        .group_by(Startup.sector, Startup.funding_stage)
+        .all()
+    )
+    totals = {}
+    for sector, stage, count, growth, saved in rows:
+        for key in (("sector", sector), ("funding_stage", stage)):
+            entry = totals.setdefault(key, [0, 0.0, 0])
+            entry[0] += count
+            entry[1] += growth or 0.0
+            entry[2] += saved or 0
     
-    return result
-
-def get_funding_stage_counts(db: Session) -> dict:
-    """Get count of startups by funding stage"""
-    result = {}
-    startups = db.query(Startup).all()
-    for startup in startups:
-        if startup.funding_stage in result:
-            result[startup.funding_stage] += 1
-        else:
-            result[startup.funding_stage] = 1
-    return result
+    db.query(AnalyticsSummary).delete(synchronize_session=False)
+    db.bulk_insert_mappings(AnalyticsSummary, [
+        {"dimension": dimension, "value": value, "startup_count": count, "growth_total": growth, "saved_count": saved}
+        for (dimension, value), (count, growth, saved) in totals.items()
+    ])
+    db.commit()
+    return len(totals)
 
+def get_analytics_summary(db: Session, user_id: str) -> dict:
+    """Dashboard aggregates read from the summary table (one row per sector/stage)"""
+    rows = db.query(AnalyticsSummary).filter(AnalyticsSummary.startup_count > 0).all()
+    sectors = [row for row in rows if row.dimension == "sector"]
+    return {
+        "sector_distribution": {row.value: row.startup_count for row in sectors},
+        "avg_growth_by_sector": {row.value: row.growth_total / row.startup_count for row in sectors},
+        "funding_stage_counts": {row.value: row.startup_count for row in rows if row.dimension == "funding_stage"},
+        "total_saved": count_saved_startups(db, user_id),
+        "total_viewed": sum(row.startup_count for row in sectors),
+    }
@@ -0,0 +1,62 @@
+import functools
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from backend import crud
+from backend.database import ReadSessionLocal
+from backend.models import Startup
+
+# Async versions of the crud functions for handlers running on the event loop. Each one
+# runs its backend.crud counterpart through AsyncSession.run_sync, so every query is
+# written once and the I/O is awaited through aiosqlite instead of tying up a threadpool thread.
+# run_sync callbacks execute on the event loop thread though, so anything CPU-bound (numpy
+# scans, ranking) goes through run_in_thread instead.
+
+
+def _run_sync(fn):
+    @functools.wraps(fn)
+    async def run(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(fn, *args, **kwargs)
+    return run
+
+
+def _with_read_session(fn, *args, **kwargs):
+    db = ReadSessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+async def run_in_thread(fn, *args, **kwargs):
+    """Call fn(db, ...) on a worker thread with its own read-only sync session"""
+    return await run_in_threadpool(_with_read_session, fn, *args, **kwargs)
+
+
+get_startups = _run_sync(crud.get_startups)
+get_ranked_startups_for_user = _run_sync(crud.get_ranked_startups_for_user)
+set_ai_summary = _run_sync(crud.set_ai_summary)
+claim_ai_summary = _run_sync(crud.claim_ai_summary)
+release_ai_summary = _run_sync(crud.release_ai_summary)
+get_startup_by_id = _run_sync(crud.get_startup_by_id)
+search_startups = _run_sync(crud.search_startups)
+save_startup = _run_sync(crud.save_startup)
+unsave_startup = _run_sync(crud.unsave_startup)
+is_startup_saved = _run_sync(crud.is_startup_saved)
+count_saved_startups = _run_sync(crud.count_saved_startups)
+get_saved_startups = _run_sync(crud.get_saved_startups)
+record_swipe = _run_sync(crud.record_swipe)
+get_swiped_startup_ids = _run_sync(crud.get_swiped_startup_ids)
+get_swipe_history = _run_sync(crud.get_swipe_history)
+save_user_preferences = _run_sync(crud.save_user_preferences)
+get_user_preferences = _run_sync(crud.get_user_preferences)
+get_analytics_summary = _run_sync(crud.get_analytics_summary)
+
+
+async def get_startups_by_ids(db: AsyncSession, startup_ids: List[int]) -> List[Startup]:
+    """The given startups in request order, skipping unknown ids and duplicates"""
+    by_id = {s.id: s for s in (await db.scalars(select(Startup).where(Startup.id.in_(startup_ids)))).all()}
+    return [by_id[startup_id] for startup_id in dict.fromkeys(startup_ids) if startup_id in by_id]
@@ -1,13 +1,88 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./startupswipe.db"
+from backend import config
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL, read_only: bool = False, tuned: bool = True):
+    """Engine for the app database.
+
+    SQLite allows one writer at a time, so the write engine has a single pooled
+    connection: writers queue in the pool instead of failing with "database is locked".
+    Read engines get a larger pool of query_only connections, which WAL lets run
+    alongside the writer.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url)
+    if not tuned:
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    if read_only:
+        pool_args = {"pool_size": config.DB_READ_POOL_SIZE, "max_overflow": config.DB_READ_MAX_OVERFLOW}
+    else:
+        pool_args = {"pool_size": 1, "max_overflow": 0, "pool_timeout": config.DB_WRITE_POOL_TIMEOUT}
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        **pool_args,
+    )
+
+    _set_sqlite_pragmas(engine, read_only)
+    return engine
+
+
+def make_async_engine(url: str = SQLALCHEMY_DATABASE_URL, read_only: bool = False):
+    """aiosqlite engine with the same pragmas and writer/reader pool split as make_engine.
+
+    Its writer is a second write connection beside make_engine's: handlers write through
+    this one, background threads and CLIs (swipe flusher, embedding backfill, neighbor
+    lists) through the sync one. The two don't queue for each other in a pool; they meet
+    at SQLite's write lock and wait out busy_timeout, which costs request-path writes some
+    tail latency while a background job is writing (`python -m backend.db_benchmark
+    --writer-pools` measures it) but no errors.
+    """
+    if not url.startswith("sqlite"):
+        return create_async_engine(url)
+    url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if read_only:
+        pool_args = {"pool_size": config.DB_READ_POOL_SIZE, "max_overflow": config.DB_READ_MAX_OVERFLOW}
+    else:
+        pool_args = {"pool_size": 1, "max_overflow": 0, "pool_timeout": config.DB_WRITE_POOL_TIMEOUT}
+    # aiosqlite defaults to NullPool (a new connection per checkout); pool like the sync engines
+    engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **pool_args)
+    _set_sqlite_pragmas(engine.sync_engine, read_only)
+    return engine
+
+
+def _set_sqlite_pragmas(engine, read_only: bool):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+engine = make_engine()
+read_engine = make_engine(read_only=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async sessions for handlers on the event loop; objects stay readable after commit
+async_engine = make_async_engine()
+async_read_engine = make_async_engine(read_only=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -18,3 +93,21 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """Session on the read-only pool, for endpoints that never write"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """AsyncSession on the writer connection"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """AsyncSession on the read-only pool, for endpoints that never write"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
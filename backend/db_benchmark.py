@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import os
+import random
+import multiprocessing
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend.database import Base, make_async_engine, make_engine
+from backend import models  # noqa: F401  (registers the tables on Base)
+
+SECTORS = ["FinTech", "HealthTech", "AI/ML", "GreenTech", "EdTech", "PropTech"]
+
+
+def create_database(url: str, startups: int, tuned: bool = True):
+    """Fresh database with `startups` synthetic rows (left in rollback-journal mode unless tuned)"""
+    engine = make_engine(url, tuned=tuned)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO startups (name, sector, description, valuation, revenue, growth_rate, funding_stage, "
+                 "employees, location, city, state, is_saved) VALUES (:name, :sector, 'benchmark startup', 100, 10, "
+                 ":growth, 'Seed', 10, 'Austin, TX', 'austin', 'tx', 0)"),
+            [{"name": f"Startup {i}", "sector": SECTORS[i % len(SECTORS)], "growth": float(i % 500)} for i in range(startups)],
+        )
+    engine.dispose()
+
+
+SWIPE_SQL = text("INSERT INTO swipe_events (user_id, startup_id, direction, created_at) VALUES (:user_id, :startup_id, 'right', :now)")
+INTEREST_SQL = text("UPDATE startups SET user_interest_score = user_interest_score + 1 WHERE id = :id")
+
+
+def _swipe_params(worker, i: int) -> tuple:
+    return {"user_id": f"bench-{worker}", "startup_id": i % 1000 + 1, "now": time.time()}, {"id": i % 1000 + 1}
+
+
+def _sync_write(engine, worker, i: int):
+    swipe, interest = _swipe_params(worker, i)
+    with engine.begin() as conn:
+        conn.execute(SWIPE_SQL, swipe)
+        conn.execute(INTEREST_SQL, interest)
+
+
+def _reader(url: str, tuned: bool, deadline: float) -> tuple:
+    engine = make_engine(url, read_only=True, tuned=tuned)
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT id, name, growth_rate FROM startups WHERE sector = :sector "
+                                  "ORDER BY id LIMIT 20"), {"sector": random.choice(SECTORS)}).fetchall()
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    return latencies, errors
+
+
+def _writer(url: str, tuned: bool, deadline: float, worker: int) -> tuple:
+    engine = make_engine(url, tuned=tuned)
+    latencies, errors = [], 0
+    i = 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            # One commit per event, the way a save or a single swipe is written
+            _sync_write(engine, worker, i)
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            errors += 1
+        i += 1
+    engine.dispose()
+    return latencies, errors
+
+
+async def _async_write(engine, worker, i: int):
+    swipe, interest = _swipe_params(worker, i)
+    async with engine.begin() as conn:
+        await conn.execute(SWIPE_SQL, swipe)
+        await conn.execute(INTEREST_SQL, interest)
+
+
+async def _in_process(url: str, shared: bool, tasks: int, threads: int, seconds: float) -> dict:
+    """Event-loop writers plus background-thread writers in one process, like the server.
+
+    With `shared` the threads hand their writes to the loop's async writer pool; otherwise
+    they use a sync writer pool of their own, so two connections compete for the write lock.
+    """
+    async_engine = make_async_engine(url)
+    sync_engine = None if shared else make_engine(url)
+    loop = asyncio.get_running_loop()
+    deadline = time.time() + seconds
+    latencies, errors = {"loop": [], "thread": []}, {"loop": 0, "thread": 0}
+
+    async def task_writer(worker: int):
+        i = 0
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                await _async_write(async_engine, f"task-{worker}", i)
+                latencies["loop"].append(time.perf_counter() - started)
+            except OperationalError:
+                errors["loop"] += 1
+            i += 1
+
+    def thread_writer(worker: int):
+        i = 0
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                if shared:
+                    asyncio.run_coroutine_threadsafe(_async_write(async_engine, f"thread-{worker}", i), loop).result()
+                else:
+                    _sync_write(sync_engine, f"thread-{worker}", i)
+                latencies["thread"].append(time.perf_counter() - started)
+            except OperationalError:
+                errors["thread"] += 1
+            i += 1
+
+    workers = [threading.Thread(target=thread_writer, args=(w,)) for w in range(threads)]
+    for worker in workers:
+        worker.start()
+    await asyncio.gather(*(task_writer(w) for w in range(tasks)))
+    await asyncio.to_thread(lambda: [worker.join() for worker in workers])
+    await async_engine.dispose()
+    if sync_engine is not None:
+        sync_engine.dispose()
+
+    result = {}
+    for side in ("loop", "thread"):
+        ms = np.array(latencies[side] or [0.0]) * 1000
+        result[side] = (len(latencies[side]) / seconds, float(np.percentile(ms, 50)), float(np.percentile(ms, 99)), errors[side])
+    return result
+
+
+def benchmark_writer_pools(tasks: int = 4, threads: int = 2, seconds: float = 5.0, startups: int = 5000):
+    """Compare one shared writer connection with separate sync and async writer pools"""
+    print(f"{tasks} event-loop writers, {threads} thread writers, {seconds:.0f}s, {startups} startups")
+    print(f"{'writers':<10}{'side':<8}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, shared in (("one", True), ("two", False)):
+            url = f"sqlite:///{os.path.join(directory, label + '.db')}"
+            create_database(url, startups)
+            result = asyncio.run(_in_process(url, shared, tasks, threads, seconds))
+            for side, (per_s, p50, p99, errors) in result.items():
+                print(f"{label:<10}{side:<8}{per_s:>10.0f}{p50:>9.2f}{p99:>9.2f}{errors:>8}")
+
+
+def run(url: str, tuned: bool, readers: int, writers: int, seconds: float) -> dict:
+    """Hammer one database from separate reader and writer processes and collect latencies"""
+    with multiprocessing.get_context("spawn").Pool(readers + writers) as pool:
+        pool.map(time.sleep, [0.2] * (readers + writers))  # start every worker before the clock runs
+        deadline = time.time() + seconds
+        read_results = [pool.apply_async(_reader, (url, tuned, deadline)) for _ in range(readers)]
+        write_results = [pool.apply_async(_writer, (url, tuned, deadline, w)) for w in range(writers)]
+        reads = [result.get() for result in read_results]
+        writes = [result.get() for result in write_results]
+
+    def summary(results):
+        latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+        errors = sum(worker_errors for _, worker_errors in results)
+        if not latencies:
+            return 0.0, 0.0, 0.0, errors
+        ms = np.array(latencies) * 1000
+        return len(latencies) / seconds, float(np.percentile(ms, 50)), float(np.percentile(ms, 99)), errors
+
+    reads_per_s, read_p50, read_p99, read_errors = summary(reads)
+    writes_per_s, write_p50, write_p99, write_errors = summary(writes)
+    return {
+        "reads_per_s": reads_per_s, "read_p50_ms": read_p50, "read_p99_ms": read_p99, "read_errors": read_errors,
+        "writes_per_s": writes_per_s, "write_p50_ms": write_p50, "write_p99_ms": write_p99, "write_errors": write_errors,
+    }
+
+
+def benchmark(readers: int = 8, writers: int = 4, seconds: float = 5.0, startups: int = 5000):
+    """Compare the default SQLite setup with the tuned one (WAL, pragmas, split pools)"""
+    print(f"{readers} readers, {writers} writers, {seconds:.0f}s, {startups} startups")
+    print(f"{'setup':<10}{'reads/s':>10}{'read p50':>10}{'read p99':>10}{'errors':>8}"
+          f"{'writes/s':>10}{'write p50':>11}{'write p99':>11}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, tuned in (("default", False), ("tuned", True)):
+            url = f"sqlite:///{os.path.join(directory, label + '.db')}"
+            create_database(url, startups, tuned)
+            r = run(url, tuned, readers, writers, seconds)
+            print(f"{label:<10}{r['reads_per_s']:>10.0f}{r['read_p50_ms']:>10.2f}{r['read_p99_ms']:>10.2f}{r['read_errors']:>8}"
+                  f"{r['writes_per_s']:>10.0f}{r['write_p50_ms']:>11.2f}{r['write_p99_ms']:>11.2f}{r['write_errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent read/write benchmark for the SQLite configuration")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--startups", type=int, default=5000)
+    parser.add_argument("--writer-pools", action="store_true",
+                        help="compare one writer connection with separate sync and async writers in one process")
+    args = parser.parse_args()
+    if args.writer_pools:
+        benchmark_writer_pools(args.writers, args.writers // 2 or 1, args.seconds, args.startups)
+    else:
+        benchmark(args.readers, args.writers, args.seconds, args.startups)
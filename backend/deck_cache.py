@@ -0,0 +1,145 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend import crud, schemas
+from backend.database import ReadSessionLocal
+from backend.response_cache import response_cache
+
+DECK_SIZE = int(os.getenv("DECK_SIZE", "50"))  # ranked cards fetched per refill
+LOW_WATER_MARK = int(os.getenv("DECK_LOW_WATER_MARK", "15"))  # refill once fewer cards than this remain
+MAX_DECKS = int(os.getenv("DECK_CACHE_MAX_USERS", "10000"))
+REFILL_WORKERS = int(os.getenv("DECK_REFILL_WORKERS", "2"))
+
+
+class Deck:
+    """One user's queue of upcoming ranked cards"""
+
+    def __init__(self, user_id: str, preferences: dict):
+        self.user_id = user_id
+        self.preferences = preferences
+        self.cards = deque()
+        self.seen = set()  # ids ever queued or swiped; refills re-rank everything else
+        self.exhausted_at = None  # response_cache versions when a refill last came back empty
+        self.refilling = False
+
+    @property
+    def exhausted(self) -> bool:
+        """Ran dry, and neither the catalog nor the user's swipes and saves changed since"""
+        return self.exhausted_at is not None and self.exhausted_at == response_cache.versions(self.user_id)
+
+
+class DeckCache:
+    """Per-user decks of ranked StartupCards, served from memory and refilled in the background"""
+
+    def __init__(self, size: int = DECK_SIZE, low_water_mark: int = LOW_WATER_MARK,
+                 max_decks: int = MAX_DECKS, workers: int = REFILL_WORKERS):
+        self.size = size
+        self.low_water_mark = low_water_mark
+        self.max_decks = max_decks
+        self._decks: "OrderedDict[str, Deck]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deck-refill")
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+
+    def _fill(self, db: Session, user_id: str, deck: Deck):
+        """Rank the best startups the deck hasn't queued and the user hasn't swiped yet, and append them.
+
+        Ranks change with every swipe, so each refill re-ranks all unseen startups rather
+        than paging on from the last one; a startup that rose past that point would
+        otherwise never be queued.
+        """
+        versions = response_cache.versions(user_id)
+        swiped = crud.get_swiped_startup_ids(db, user_id)
+        with self._lock:
+            deck.seen.update(swiped)
+            seen = list(deck.seen)
+        ranked = crud.get_ranked_startups_for_user(db, user_id, deck.preferences, limit=self.size, exclude_ids=seen)
+        cards = [schemas.StartupCard.model_validate(startup) for startup, _ in ranked]
+        with self._lock:
+            deck.exhausted_at = None if ranked else versions
+            for card in cards:
+                if card.id not in deck.seen:
+                    deck.seen.add(card.id)
+                    deck.cards.append(card)
+            self.refills += 1
+
+    def _refill(self, user_id: str, deck: Deck):
+        db = ReadSessionLocal()
+        try:
+            self._fill(db, user_id, deck)
+        except Exception as e:
+            print(f"Error refilling deck for user {user_id}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                deck.refilling = False
+
+    def _schedule_refill(self, user_id: str, deck: Deck):
+        """Queue a background refill unless one is running or the deck is full enough; needs the lock held"""
+        if deck.refilling or deck.exhausted or len(deck.cards) >= self.low_water_mark:
+            return
+        deck.refilling = True
+        self._executor.submit(self._refill, user_id, deck)
+
+    def _install(self, user_id: str, deck: Deck):
+        """Make `deck` the user's current deck; needs the lock held"""
+        self._decks[user_id] = deck
+        self._decks.move_to_end(user_id)
+        while len(self._decks) > self.max_decks:
+            self._decks.popitem(last=False)
+
+    def take(self, db: Session, user_id: str, preferences: dict, limit: int = 10) -> List[schemas.StartupCard]:
+        """Pop the user's next `limit` cards, ranking synchronously only on a cold or stale deck"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is not None and deck.preferences == preferences:
+                self._decks.move_to_end(user_id)
+                self.hits += 1
+            else:
+                deck = None
+                self.misses += 1
+        # The background refill normally keeps ahead; rank inline only if it hasn't
+        if deck is None or (len(deck.cards) < limit and not deck.exhausted):
+            deck = deck or Deck(user_id, preferences)
+            self._fill(db, user_id, deck)
+            with self._lock:
+                self._install(user_id, deck)
+
+        with self._lock:
+            cards = [deck.cards.popleft() for _ in range(min(limit, len(deck.cards)))]
+            self._schedule_refill(user_id, deck)
+        return cards
+
+    def refresh(self, user_id: str, preferences: dict):
+        """Replace a user's deck after their preferences change, building the new one in the background"""
+        deck = Deck(user_id, preferences)
+        with self._lock:
+            self._install(user_id, deck)
+            self._schedule_refill(user_id, deck)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one user's deck, or every deck when the catalog changes"""
+        with self._lock:
+            if user_id is None:
+                self._decks.clear()
+            else:
+                self._decks.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "decks": len(self._decks),
+                "hits": self.hits,
+                "misses": self.misses,
+                "refills": self.refills,
+            }
+
+
+deck_cache = DeckCache()
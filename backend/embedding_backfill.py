@@ -0,0 +1,151 @@
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+from backend.database import ReadSessionLocal, SessionLocal
+from backend.ann_index import ann_index
+from backend.embedding_index import embedding_index
+from backend.embedding_providers import EmbeddingProvider, embedding_provider, get_embedding_provider
+from backend.embedding_store import encode_embedding
+from backend.models import Startup
+from backend.neighbors import neighbors_built, refresh_neighbors
+from backend.response_cache import response_cache
+from backend.scoring import store_sector_similarities
+from backend.openai_utils import get_startup_embedding_text
+
+
+def iter_missing_batches(batch_size: int, model: str = embedding_provider.name) -> Iterator[List[Tuple[int, str]]]:
+    """Yield (startup_id, text) batches for startups without an embedding from `model`, in id order"""
+    last_id = 0
+    while True:
+        db = ReadSessionLocal()
+        try:
+            rows = (
+                db.query(Startup.id, Startup.name, Startup.sector, Startup.description, Startup.location, Startup.funding_stage)
+                .filter(Startup.embedding.is_(None) | Startup.embedding_model.is_distinct_from(model), Startup.id > last_id)
+                .order_by(Startup.id)
+                .limit(batch_size)
+                .all()
+            )
+        finally:
+            db.close()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield [(row.id, get_startup_embedding_text(row)) for row in rows]
+
+
+def write_embeddings(ids: List[int], vectors: List[List[float]], model: str = embedding_provider.name, dtype: str = "float32"):
+    """Store a batch of embeddings in a single transaction and update the in-memory index"""
+    embedded = [(startup_id, vector) for startup_id, vector in zip(ids, vectors) if vector]
+    now = time.time()
+    mappings = [
+        {
+            "id": startup_id,
+            "embedding": encode_embedding(vector, dtype),
+            "embedding_dim": len(vector),
+            "embedding_dtype": dtype,
+            "embedding_model": model,
+            "embedded_at": now,
+            "similarity_vector": None,
+        }
+        for startup_id, vector in embedded
+    ]
+    db = SessionLocal()
+    try:
+        db.bulk_update_mappings(Startup, mappings)
+        db.commit()
+        sectors = dict(db.query(Startup.id, Startup.sector).filter(Startup.id.in_(ids)).all()) if ann_index.ready else {}
+    finally:
+        db.close()
+    for startup_id, vector in embedded:
+        embedding_index.upsert(startup_id, vector)
+        if ann_index.ready:
+            ann_index.upsert(startup_id, vector, sectors.get(startup_id))
+    if embedded:
+        db = SessionLocal()
+        try:
+            refresh_neighbors(db, [startup_id for startup_id, _ in embedded])
+        except Exception as e:
+            print(f"Error refreshing neighbor lists: {e}")
+        finally:
+            db.close()
+        response_cache.bump_catalog()  # similar-startup results may change
+    return len(embedded)
+
+
+def backfill_embeddings(batch_size: int = 128, concurrency: int = 4, max_retries: int = 5,
+                        base_url: Optional[str] = None, dtype: Optional[str] = None,
+                        provider: Optional[EmbeddingProvider] = None) -> dict:
+    """Embed every startup missing a vector from the provider, batching and parallelizing calls"""
+    dtype = dtype or os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+    if provider is None:
+        provider = get_embedding_provider(base_url=base_url, max_retries=max_retries)
+    stats = {"embedded": 0, "failed": 0, "batches": 0, "seconds": 0.0}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+        batches = iter_missing_batches(batch_size, provider.name)
+        exhausted = False
+        while pending or not exhausted:
+            # Keep a bounded number of batches in flight so memory stays flat
+            while not exhausted and len(pending) < concurrency * 2:
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                ids = [startup_id for startup_id, _ in batch]
+                texts = [text for _, text in batch]
+                pending[executor.submit(provider.embed, texts)] = ids
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ids = pending.pop(future)
+                stats["batches"] += 1
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    print(f"Error embedding batch of {len(ids)} startups: {e}")
+                    stats["failed"] += len(ids)
+                    continue
+                stats["embedded"] += write_embeddings(ids, vectors, provider.name, dtype=dtype)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate embeddings for startups that don't have one yet")
+    parser.add_argument("--batch-size", type=int, default=128, help="texts per embeddings API call")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum batches in flight")
+    parser.add_argument("--retries", type=int, default=5, help="retries per batch on transient errors")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible API base URL (e.g. a local stub)")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default=None)
+    args = parser.parse_args()
+
+    from backend.database import engine
+    from backend.migrations import run_migrations
+
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        if neighbors_built(db):
+            embedding_index.load_from_db(db, embedding_provider.name)  # refreshing the stored lists scores the whole catalog
+    finally:
+        db.close()
+    result = backfill_embeddings(args.batch_size, args.concurrency, args.retries, args.base_url, args.dtype)
+    rate = result["embedded"] / result["seconds"] if result["seconds"] else 0.0
+    print(f"Embedded {result['embedded']} startups in {result['batches']} batches "
+          f"({result['failed']} failed) in {result['seconds']}s ({rate:.1f}/s)")
+    if result["embedded"]:
+        db = SessionLocal()
+        try:
+            embedding_index.load_from_db(db, embedding_provider.name)  # the centroids span the whole catalog
+            print(f"Stored sector similarities: {store_sector_similarities(db)}")
+        finally:
+            db.close()
@@ -0,0 +1,162 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.models import Startup
+from backend.embedding_providers import embedding_provider
+from backend.embedding_store import decode_embedding
+
+
+class EmbeddingIndex:
+    """In-memory matrix of L2-normalized startup embeddings for top-k search"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._size = 0
+        self.version = 0  # bumped on every mutation so dependents can cache derived data
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, startup_id: int) -> bool:
+        return startup_id in self._positions
+
+    @staticmethod
+    def _normalize(vector) -> Optional[np.ndarray]:
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(v))
+        if v.size == 0 or norm == 0.0:
+            return None
+        return v / norm
+
+    def _reserve(self, dim: int, capacity: int):
+        """Grow the backing arrays geometrically so upserts stay amortized O(dim)"""
+        if self._matrix.shape[1] != dim:
+            if self._size:
+                raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._matrix.shape[1]}")
+            self._matrix = np.zeros((0, dim), dtype=np.float32)
+        if capacity <= self._matrix.shape[0]:
+            return
+        new_capacity = max(capacity, 2 * self._matrix.shape[0], 64)
+        matrix = np.zeros((new_capacity, dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+
+    def load(self, items: Iterable[Tuple[int, List[float]]]):
+        """Replace the index contents with (startup_id, vector) pairs"""
+        rows = []
+        ids = []
+        for startup_id, vector in items:
+            v = self._normalize(vector)
+            if v is not None:
+                rows.append(v)
+                ids.append(startup_id)
+        with self._lock:
+            if rows:
+                self._matrix = np.vstack(rows).astype(np.float32, copy=False)
+                self._ids = np.asarray(ids, dtype=np.int64)
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+                self._ids = np.zeros(0, dtype=np.int64)
+            self._size = len(ids)
+            self._positions = {startup_id: i for i, startup_id in enumerate(ids)}
+            self.version += 1
+
+    def load_from_db(self, db, model: Optional[str] = None):
+        """Build the index from every startup embedded by `model` (default: the configured provider).
+
+        Vectors from any other model are left out, never compared with these.
+        """
+        rows = (
+            db.query(Startup.id, Startup.embedding, Startup.embedding_dtype, Startup.embedding_dim)
+            .filter(Startup.embedding.isnot(None), Startup.embedding_model == (model or embedding_provider.name))
+            .yield_per(1000)
+        )
+        self.load((startup_id, decode_embedding(blob, dtype, dim)) for startup_id, blob, dtype, dim in rows)
+
+    def upsert(self, startup_id: int, vector: List[float]):
+        """Insert or replace a single startup's vector"""
+        v = self._normalize(vector)
+        if v is None:
+            self.remove(startup_id)
+            return
+        with self._lock:
+            position = self._positions.get(startup_id)
+            if position is None:
+                self._reserve(v.size, self._size + 1)
+                position = self._size
+                self._ids[position] = startup_id
+                self._positions[startup_id] = position
+                self._size += 1
+            elif v.size != self._matrix.shape[1]:
+                raise ValueError(f"Embedding dimension {v.size} does not match index dimension {self._matrix.shape[1]}")
+            self._matrix[position] = v
+            self.version += 1
+
+    def remove(self, startup_id: int):
+        """Drop a startup from the index by swapping the last row into its slot"""
+        with self._lock:
+            position = self._positions.pop(startup_id, None)
+            if position is None:
+                return
+            last = self._size - 1
+            if position != last:
+                moved_id = int(self._ids[last])
+                self._matrix[position] = self._matrix[last]
+                self._ids[position] = moved_id
+                self._positions[moved_id] = position
+            self._size = last
+            self.version += 1
+
+    def get_vector(self, startup_id: int) -> Optional[np.ndarray]:
+        """Return a copy of the normalized vector stored for a startup"""
+        with self._lock:
+            position = self._positions.get(startup_id)
+            if position is None:
+                return None
+            return self._matrix[position].copy()
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """(matrix view, ids, version) for bulk consumers; the view is not copied, so read it promptly"""
+        with self._lock:
+            return self._matrix[:self._size], self._ids[:self._size].copy(), self.version
+
+    def search(self, vector, limit: int = 3, exclude: Iterable[int] = (),
+               only: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Return the top `limit` (startup_id, cosine similarity) pairs for a query vector.
+
+        `only` restricts the search to those startup ids (e.g. one sector).
+        """
+        query = self._normalize(vector)
+        if query is None or limit <= 0:
+            return []
+        with self._lock:
+            if self._size == 0 or query.size != self._matrix.shape[1]:
+                return []
+            if only is None:
+                scores = self._matrix[:self._size] @ query
+                ids = self._ids[:self._size].copy()
+            else:
+                rows = np.array([self._positions[i] for i in set(only) if i in self._positions], dtype=np.int64)
+                scores = self._matrix[rows] @ query
+                ids = self._ids[rows]
+            position_of = {int(startup_id): i for i, startup_id in enumerate(ids)} if only is not None else self._positions
+            excluded = [position_of[i] for i in set(exclude) if i in position_of]
+
+        if excluded:
+            scores[excluded] = -np.inf
+        k = min(limit, scores.size - len(excluded))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+embedding_index = EmbeddingIndex()
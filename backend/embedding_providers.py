@@ -0,0 +1,130 @@
+import math
+import os
+import random
+import re
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Iterator, List, Optional
+
+import numpy as np
+import openai
+from openai import OpenAI
+
+from backend.ai_client import create_embeddings
+from backend.embedding_store import EMBEDDING_MODEL
+
+PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")  # "openai" or "local"
+LOCAL_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "512"))  # vector size of the local provider
+
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError, openai.InternalServerError)
+
+
+class EmbeddingProvider(ABC):
+    """Turns batches of texts into embedding vectors.
+
+    `name` is stored with every vector the provider produces (Startup.embedding_model)
+    and identifies its model and dimension, so only vectors with the configured name are
+    loaded and compared; the rest count as missing and are re-embedded.
+    """
+
+    name: str
+    local = False  # embeds in-process, without a network call
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, in input order; raises if the batch fails"""
+
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """An OpenAI-compatible embeddings API, retrying transient failures with exponential backoff"""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, base_url: Optional[str] = None, max_retries: int = 5,
+                 backoff: float = 0.5, max_backoff: float = 30.0):
+        self.name = model
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._client: Optional[OpenAI] = None
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=self.base_url, max_retries=0)
+        return self._client
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(input=texts, model=self.name)
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"Embedding batch failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        # Shares the async client's concurrency limit and in-flight deduplication
+        return await create_embeddings(texts, self.name)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Local CPU embeddings: signed feature hashing of words, word pairs and character trigrams.
+
+    Needs no network or model files and gives the same vector in every process, so it
+    suits offline deployments and tests. It matches shared vocabulary, not meaning.
+    """
+
+    local = True
+    VERSION = 1  # part of the name: bump when the features change so old vectors are re-embedded
+    # Weight per feature family; trigrams mostly catch inflections ("payment" / "payments")
+    FEATURE_WEIGHTS = {"w": 1.0, "b": 0.5, "c": 0.2}
+    STOPWORDS = frozenset(
+        "a an and are as at be by for from how in into is it its of on or our that the their to with".split()
+    )
+
+    def __init__(self, dim: int = LOCAL_DIM):
+        self.dim = dim
+        self.name = f"local-hash-v{self.VERSION}-{dim}"
+
+    def features(self, text: str) -> Iterator[str]:
+        words = [word for word in re.findall(r"\w+", text.lower()) if word not in self.STOPWORDS]
+        for i, word in enumerate(words):
+            yield f"w:{word}"
+            if i:
+                yield f"b:{words[i - 1]} {word}"
+            padded = f"<{word}>"
+            for j in range(len(padded) - 2):
+                yield f"c:{padded[j:j + 3]}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in Counter(self.features(text)).items():
+                # crc32, unlike hash(), is the same in every process
+                h = zlib.crc32(feature.encode())
+                sign = 1.0 if h & 0x80000000 else -1.0
+                matrix[row, h % self.dim] += sign * self.FEATURE_WEIGHTS[feature[0]] * (1.0 + math.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.maximum(norms, 1e-12)).tolist()
+
+
+def get_embedding_provider(name: Optional[str] = None, base_url: Optional[str] = None,
+                           max_retries: int = 5) -> EmbeddingProvider:
+    """The provider called `name` (default EMBEDDING_PROVIDER); `base_url`/`max_retries` apply to openai"""
+    name = name or PROVIDER
+    if name == "openai":
+        return OpenAIEmbeddingProvider(base_url=base_url, max_retries=max_retries)
+    if name == "local":
+        return HashingEmbeddingProvider()
+    raise ValueError(f"Unknown embedding provider: {name} (expected openai or local)")
+
+
+embedding_provider = get_embedding_provider()
@@ -0,0 +1,70 @@
+import json
+import time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.models import Startup
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+STORAGE_DTYPES = ("float32", "float16")
+
+
+def encode_embedding(vector, dtype: str = "float32") -> bytes:
+    """Pack an embedding into raw little-endian float bytes"""
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    return np.asarray(vector, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+
+
+def decode_embedding(blob: bytes, dtype: str = "float32", dim: Optional[int] = None) -> np.ndarray:
+    """View stored embedding bytes as a read-only array without copying"""
+    vector = np.frombuffer(blob, dtype=np.dtype(dtype or "float32").newbyteorder("<"))
+    if dim is not None and vector.size != dim:
+        raise ValueError(f"Stored embedding has {vector.size} values, expected {dim}")
+    return vector
+
+
+def set_startup_embedding(startup: Startup, vector: List[float], model: str = EMBEDDING_MODEL, dtype: str = "float32"):
+    """Store an embedding on a startup row along with its dimension and model"""
+    startup.embedding = encode_embedding(vector, dtype)
+    startup.embedding_dim = len(vector)
+    startup.embedding_dtype = dtype
+    startup.embedding_model = model
+    startup.embedded_at = time.time()
+    startup.similarity_vector = None
+
+
+def get_startup_embedding(startup: Startup) -> Optional[np.ndarray]:
+    """Read a startup's embedding, falling back to the legacy JSON column"""
+    if startup.embedding is not None:
+        return decode_embedding(startup.embedding, startup.embedding_dtype, startup.embedding_dim)
+    if startup.similarity_vector:
+        vector = json.loads(startup.similarity_vector)
+        return np.asarray(vector, dtype=np.float32) if vector else None
+    return None
+
+
+def migrate_json_embeddings(db: Session, dtype: str = "float32", batch_size: int = 500) -> int:
+    """Convert legacy JSON `similarity_vector` rows to binary embeddings"""
+    converted = 0
+    while True:
+        startups = (
+            db.query(Startup)
+            .filter(Startup.similarity_vector.isnot(None), Startup.embedding.is_(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not startups:
+            break
+        for startup in startups:
+            vector = json.loads(startup.similarity_vector)
+            if vector:
+                set_startup_embedding(startup, vector, dtype=dtype)
+                converted += 1
+            else:
+                # Failed embeddings were stored as "[]"; clear them so they get regenerated
+                startup.similarity_vector = None
+        db.commit()
+    return converted
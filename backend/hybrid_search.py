@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend import crud
+from backend.ann_index import SIMILARITY_BACKEND, ann_index
+from backend.embedding_index import EmbeddingIndex, embedding_index
+from backend.models import Startup
+
+CANDIDATES = int(os.getenv("HYBRID_SEARCH_CANDIDATES", "100"))  # taken from each retriever before fusion
+RRF_K = 60  # reciprocal rank fusion damping: higher flattens the gap between top and lower ranks
+RELEVANCE_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "search_relevance.json")
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists into one: score(id) = sum over lists of 1 / (k + rank).
+
+    Uses only ranks, so BM25 and cosine scores need no calibration against each other.
+    Returns (id, score) best first, ties by id.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, startup_id in enumerate(ranking, start=1):
+            scores[startup_id] = scores.get(startup_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def semantic_candidates(vector: Optional[np.ndarray], limit: int = CANDIDATES,
+                        index: Optional[EmbeddingIndex] = None) -> List[int]:
+    """Startup ids nearest to a query embedding, from the same index /api/similar uses"""
+    if vector is None:
+        return []
+    if index is None and SIMILARITY_BACKEND == "ivf" and ann_index.ready:
+        return [startup_id for startup_id, _ in ann_index.search(vector, limit=limit)]
+    return [startup_id for startup_id, _ in (index or embedding_index).search(vector, limit=limit)]
+
+
+def hybrid_search(db: Session, query: str, vector: Optional[np.ndarray], limit: int = 20,
+                  after: Optional[Tuple[float, int]] = None, index: Optional[EmbeddingIndex] = None,
+                  **filters) -> List[Tuple[Startup, float]]:
+    """Keyword and semantic search fused with RRF; one page of (startup, score), best first.
+
+    The keyword side matches any query word (BM25 favours rows matching more of them);
+    the semantic side takes the startups nearest the query embedding. `after` is the
+    (score, id) of the previous page's last row. `filters` are those of crud.filter_startups.
+    Without a vector this is keyword search only.
+    """
+    lexical = [startup.id for startup, _ in crud.search_startups(db, query, prefix=False, match_all=False,
+                                                                 limit=CANDIDATES, **filters)]
+    semantic = semantic_candidates(vector, index=index)
+    if semantic and any(value is not None and value != [] for value in filters.values()):
+        allowed = {startup_id for startup_id, in crud.filter_startups(db.query(Startup.id), **filters)
+                   .filter(Startup.id.in_(semantic))}
+        semantic = [startup_id for startup_id in semantic if startup_id in allowed]
+
+    fused = reciprocal_rank_fusion([lexical, semantic])
+    if after is not None:
+        last_score, last_id = after
+        fused = [(i, score) for i, score in fused if score < last_score or (score == last_score and i > last_id)]
+    fused = fused[:limit]
+    by_id = {startup.id: startup for startup in db.query(Startup).filter(Startup.id.in_([i for i, _ in fused]))}
+    return [(by_id[startup_id], score) for startup_id, score in fused if startup_id in by_id]
+
+
+def load_relevance_fixture(path: str = RELEVANCE_FIXTURE_PATH) -> List[dict]:
+    with open(path) as f:
+        return json.load(f)["queries"]
+
+
+def evaluate(base_url: Optional[str] = None, k: int = 5, path: str = RELEVANCE_FIXTURE_PATH,
+             provider: Optional[str] = None):
+    """Recall@k and MRR of keyword, semantic and hybrid search on the seed catalog.
+
+    Builds a throwaway database from the seed data, embeds it and the fixture queries
+    with `provider` (default EMBEDDING_PROVIDER), and scores each mode against the judged startups.
+    """
+    from backend.catalog_import import import_catalog
+    from backend.database import Base, make_engine
+    from backend.embedding_providers import get_embedding_provider
+    from backend.openai_utils import get_startup_embedding_text
+    from backend.query_embeddings import normalize_query
+    from backend.search_index import ensure_search_index
+    from backend.seed_data import SEED_CATALOG_PATH
+
+    queries = load_relevance_fixture(path)
+    embedder = get_embedding_provider(provider, base_url=base_url)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = make_engine(f"sqlite:///{workdir}/relevance.db")
+        Base.metadata.create_all(bind=engine)
+        ensure_search_index(engine)
+        import_catalog(SEED_CATALOG_PATH, bind=engine)
+        db = Session(bind=engine)
+        try:
+            startups = db.query(Startup).order_by(Startup.id).all()
+            names = {startup.id: startup.name for startup in startups}
+            index = EmbeddingIndex()
+            index.load(zip(names, embedder.embed([get_startup_embedding_text(s) for s in startups])))
+            vectors = embedder.embed([normalize_query(q["query"]) for q in queries])
+
+            modes = {
+                "keyword": lambda q, v: [s.id for s, _ in crud.search_startups(db, q, prefix=False, match_all=False, limit=k)],
+                "semantic": lambda q, v: semantic_candidates(np.asarray(v), limit=k, index=index),
+                "hybrid": lambda q, v: [s.id for s, _ in hybrid_search(db, q, np.asarray(v), limit=k, index=index)],
+            }
+            print(f"{len(queries)} queries, {len(startups)} startups, embeddings: {embedder.name}")
+            print(f"{'mode':<12}{'recall@' + str(k):>12}{'mrr':>8}")
+            for mode, search in modes.items():
+                recalls, reciprocal_ranks = [], []
+                for q, vector in zip(queries, vectors):
+                    relevant = set(q["relevant"])
+                    found = [names[i] for i in search(q["query"], vector)]
+                    recalls.append(len(relevant & set(found)) / len(relevant))
+                    reciprocal_ranks.append(next((1 / rank for rank, name in enumerate(found, 1) if name in relevant), 0.0))
+                print(f"{mode:<12}{np.mean(recalls):>12.3f}{np.mean(reciprocal_ranks):>8.3f}")
+        finally:
+            db.close()
+            engine.dispose()
+
+
+def benchmark(n: int = 100000, dim: int = 1536, n_queries: int = 200, limit: int = 10, seed: int = 0):
+    """Latency of keyword, semantic and hybrid search on a synthetic catalog"""
+    from backend.catalog_import import import_catalog
+    from backend.database import Base, make_engine
+    from backend.search_index import ensure_search_index
+
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)  # Zipf-like word frequencies
+    weights /= weights.sum()
+    with tempfile.TemporaryDirectory() as workdir:
+        dataset = os.path.join(workdir, "catalog.jsonl")
+        with open(dataset, "w") as f:
+            for i in range(n):
+                f.write(json.dumps({
+                    "name": f"Startup {i}", "sector": f"Sector {i % 11}",
+                    "description": " ".join(rng.choice(vocabulary, 20, p=weights)),
+                    "valuation": 100.0, "revenue": 10.0, "growth_rate": float(i % 300), "funding_stage": "Seed",
+                    "employees": 10, "location": "Austin, TX",
+                }) + "\n")
+        engine = make_engine(f"sqlite:///{workdir}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        ensure_search_index(engine)
+        started = time.perf_counter()
+        import_catalog(dataset, bind=engine)
+        print(f"Loaded {n} startups in {time.perf_counter() - started:.1f}s")
+
+        index = EmbeddingIndex()
+        matrix = rng.normal(size=(n, dim)).astype(np.float32)
+        index.load(zip(range(1, n + 1), matrix))
+        del matrix
+        queries = [" ".join(rng.choice(vocabulary, 4, p=weights)) for _ in range(n_queries)]
+        vectors = rng.normal(size=(n_queries, dim)).astype(np.float32)
+
+        db = Session(bind=engine)
+        try:
+            runs = {
+                "keyword": lambda q, v: crud.search_startups(db, q, prefix=False, match_all=False, limit=limit),
+                "semantic": lambda q, v: semantic_candidates(v, limit=limit, index=index),
+                "hybrid": lambda q, v: hybrid_search(db, q, v, limit=limit, index=index),
+            }
+            print(f"{'mode':<12}{'p50 ms':>10}{'p99 ms':>10}")
+            for mode, search in runs.items():
+                latencies = []
+                for q, vector in zip(queries, vectors):
+                    started = time.perf_counter()
+                    search(q, vector)
+                    latencies.append(1000 * (time.perf_counter() - started))
+                print(f"{mode:<12}{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}")
+        finally:
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate or benchmark hybrid keyword + semantic search")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    eval_parser = subparsers.add_parser("eval", help="recall/MRR on the seed catalog against search_relevance.json")
+    eval_parser.add_argument("--provider", choices=["openai", "local"], default=None,
+                             help="embedding provider (default: EMBEDDING_PROVIDER)")
+    eval_parser.add_argument("--base-url", default=None, help="OpenAI-compatible API for embeddings")
+    eval_parser.add_argument("--k", type=int, default=5)
+    bench_parser = subparsers.add_parser("bench", help="latency on a synthetic catalog")
+    bench_parser.add_argument("--n", type=int, default=100000)
+    bench_parser.add_argument("--dim", type=int, default=1536)
+    bench_parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == "eval":
+        evaluate(base_url=args.base_url, k=args.k, provider=args.provider)
+    else:
+        benchmark(n=args.n, dim=args.dim, n_queries=args.queries)
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+import numpy as np
+
+# (weight, name, method, path template); {id} is a random startup id
+REQUEST_MIX = [
+    (30, "list startups", "GET", "/api/startups?limit=10"),
+    (20, "startup detail", "GET", "/api/startup/{id}"),
+    (20, "swipe history", "GET", "/api/swipes?limit=20"),
+    (20, "swipe", "POST", "/api/swipe"),
+    (10, "analytics", "GET", "/api/analytics"),
+]
+# LLM-bound request: random preferences miss the match score cache, so each one calls the model
+LLM_REQUEST = ("llm match score", "POST", "/api/ai-match-score?startup_id={id}&use_llm=true")
+
+
+def request_body(name: str, startup_id: int) -> Optional[dict]:
+    if name == "swipe":
+        return {"startup_id": startup_id, "direction": random.choice(["left", "right"])}
+    if name == LLM_REQUEST[0]:
+        return {
+            "selected_sectors": ["FinTech"], "work_field": "load test", "investment_stage": ["Seed"],
+            "investment_range": "any", "risk_tolerance": "Moderate", "investment_goal": uuid.uuid4().hex,
+            "experience_level": "any", "preferred_locations": [],
+        }
+    return None
+
+
+async def client_loop(client: httpx.AsyncClient, mix: list, deadline: float, users: int, startups: int, results: dict):
+    weights = [weight for weight, *_ in mix]
+    while time.perf_counter() < deadline:
+        _, name, method, path = random.choices(mix, weights)[0]
+        startup_id = random.randint(1, startups)
+        headers = {"X-User-Id": f"load-{random.randrange(users)}"}
+        body = request_body(name, startup_id)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path.format(id=startup_id), json=body, headers=headers)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        results[name].append((time.perf_counter() - started, ok))
+
+
+async def run(base_url: str, clients: int, seconds: float, users: int, startups: int, llm_weight: int = 0) -> dict:
+    """Drive `clients` concurrent clients through the request mix for `seconds`"""
+    mix = REQUEST_MIX + ([(llm_weight, *LLM_REQUEST)] if llm_weight else [])
+    results = defaultdict(list)
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(client_loop(client, mix, deadline, users, startups, results) for _ in range(clients)))
+    return results
+
+
+def report(results: dict, seconds: float):
+    print(f"{'endpoint':<18}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    everything = []
+    for name in [name for _, name, _, _ in REQUEST_MIX] + [LLM_REQUEST[0]]:
+        if name not in results:
+            continue
+        samples = results.get(name, [])
+        everything.extend(samples)
+        print_row(name, samples, seconds)
+    print_row("total", everything, seconds)
+
+
+def print_row(name: str, samples: list, seconds: float):
+    ms = np.array([latency for latency, _ in samples]) * 1000
+    errors = sum(1 for _, ok in samples if not ok)
+    print(f"{name:<18}{len(samples):>10}{len(samples) / seconds:>10.0f}{np.percentile(ms, 50):>10.1f}"
+          f"{np.percentile(ms, 99):>10.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load test against a running API server")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--users", type=int, default=1000, help="distinct X-User-Id values to spread requests over")
+    parser.add_argument("--startups", type=int, default=40, help="startup ids are drawn from 1..startups")
+    parser.add_argument("--llm-weight", type=int, default=0,
+                        help="share of LLM match score requests (out of 100 for the rest of the mix); "
+                             "run the server against the OpenAI stub")
+    args = parser.parse_args()
+    print(f"{args.clients} clients, {args.seconds:.0f}s against {args.base_url}")
+    results = asyncio.run(run(args.base_url, args.clients, args.seconds, args.users, args.startups, args.llm_weight))
+    report(results, args.seconds)
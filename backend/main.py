@@ -1,9 +1,22 @@
+import asyncio
+import os
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.database import engine
-from backend.models import Base
+from backend.database import async_engine, async_read_engine, engine, ReadSessionLocal, SessionLocal
+from backend.migrations import run_migrations
 from backend.routers import startups, analytics, ai, preferences
 from backend.seed_data import seed_startups
+from backend.embedding_index import embedding_index
+from backend.ann_index import SIMILARITY_BACKEND, load_or_build
+from backend.embedding_backfill import backfill_embeddings
+from backend.analysis_warmup import warm_analyses
+from backend.neighbors import build_neighbors, neighbors_built
+from backend.response_cache import response_cache
+from backend.scoring import scoring_engine, sector_similarities_stored, store_sector_similarities
+from backend.pagination import CURSOR_HEADER
+from backend.swipe_buffer import swipe_buffer
 
 app = FastAPI(
     title="StartupSwipe API",
@@ -18,6 +31,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CURSOR_HEADER, "ETag"],
 )
 
 # Include routers
@@ -28,9 +42,76 @@ app.include_router(preferences.router)
 
 @app.on_event("startup")
 async def startup_event():
-    """Create tables and seed data on startup"""
-    Base.metadata.create_all(bind=engine)
+    """Migrate the schema, seed data and load in-memory indexes on startup"""
+    run_migrations(engine)
     seed_startups()
+    
+    db = ReadSessionLocal()
+    try:
+        embedding_index.load_from_db(db)
+        scoring_engine.load(db)
+        if SIMILARITY_BACKEND == "ivf":
+            load_or_build(db)
+    finally:
+        db.close()
+    
+    swipe_buffer.start()
+    
+    # Fill in missing embeddings in the background so requests never embed inline
+    if os.getenv("EMBEDDING_BACKFILL_ON_STARTUP", "1") == "1":
+        threading.Thread(target=run_embedding_backfill, daemon=True).start()
+    
+    # Opt-in, since it calls the LLM for every startup without an analysis
+    if os.getenv("AI_ANALYSIS_WARMUP_ON_STARTUP", "0") == "1":
+        app.state.analysis_warmup = asyncio.create_task(run_analysis_warmup())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write any buffered swipe events and close pooled connections before exiting"""
+    warmup = getattr(app.state, "analysis_warmup", None)
+    if warmup is not None:
+        warmup.cancel()
+    # The final flush writes through the sync writer; keep it off the event loop
+    await asyncio.to_thread(swipe_buffer.stop)
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+def run_embedding_backfill():
+    stats = {}
+    try:
+        stats = backfill_embeddings()
+        if stats["embedded"] or stats["failed"]:
+            print(f"Embedding backfill: {stats}")
+    except Exception as e:
+        print(f"Error running embedding backfill: {e}")
+    
+    # Later embeddings keep the lists current incrementally; only a new database needs a full build
+    db = SessionLocal()
+    try:
+        if len(embedding_index) > 1 and not neighbors_built(db):
+            print(f"Built similar-startup lists: {build_neighbors(db)}")
+    except Exception as e:
+        print(f"Error building similar-startup lists: {e}")
+    finally:
+        db.close()
+
+    # New embeddings move the sector centroids, so the ranking's similarity terms are recomputed
+    db = SessionLocal()
+    try:
+        if stats.get("embedded") or (len(embedding_index) and not sector_similarities_stored(db)):
+            print(f"Stored sector similarities: {store_sector_similarities(db)}")
+            response_cache.bump_catalog()
+    except Exception as e:
+        print(f"Error storing sector similarities: {e}")
+    finally:
+        db.close()
+
+async def run_analysis_warmup():
+    # Runs on the server's event loop, sharing its OpenAI concurrency limit with requests
+    try:
+        print(f"Analysis warm-up: {await warm_analyses(checkpoint_path=None)}")
+    except Exception as e:
+        print(f"Error running analysis warm-up: {e}")
 
 @app.get("/")
 def root():
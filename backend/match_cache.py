@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.database import AsyncSessionLocal
+from backend.models import MatchScoreCacheEntry, Startup
+from backend.openai_utils import MATCH_SCORE_MODEL, MATCH_SCORE_PROMPT_VERSION, calculate_match_score, calculate_match_scores
+
+TTL_SECONDS = float(os.getenv("MATCH_SCORE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("MATCH_SCORE_CACHE_MAX_ENTRIES", "100000"))
+TOUCH_INTERVAL_SECONDS = 60  # coarse LRU: avoid a write on every hit
+EVICTION_CHECK_EVERY = 100  # inserts between eviction sweeps
+PACK_SIZE = int(os.getenv("MATCH_SCORE_PACK_SIZE", "5"))  # startups scored per LLM prompt in batch requests
+FALLBACK_SCORE = 75
+
+# Startup fields that feed the match-score prompt
+STARTUP_FIELDS = ("name", "sector", "description", "location", "funding_stage", "valuation", "growth_rate")
+
+
+def normalize_preferences(preferences: dict) -> dict:
+    """Canonical form of preferences: trimmed strings, sorted de-duplicated lists"""
+    normalized = {}
+    for key, value in preferences.items():
+        if isinstance(value, (list, tuple)):
+            normalized[key] = sorted({str(item).strip() for item in value})
+        elif isinstance(value, str):
+            normalized[key] = value.strip()
+        else:
+            normalized[key] = value
+    return normalized
+
+
+def cache_key(startup: Startup, preferences: dict, model: str = MATCH_SCORE_MODEL,
+              prompt_version: int = MATCH_SCORE_PROMPT_VERSION) -> str:
+    """Content hash of everything the match score depends on"""
+    payload = {
+        "startup": {field: getattr(startup, field) for field in STARTUP_FIELDS},
+        "preferences": normalize_preferences(preferences),
+        "model": model,
+        "prompt_version": prompt_version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class MatchScoreCache:
+    """SQLite-backed match score cache with TTL, LRU eviction and hit/miss counters"""
+
+    def __init__(self, ttl_seconds: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, db: Session, key: str) -> Optional[int]:
+        now = time.time()
+        entry = db.get(MatchScoreCacheEntry, key)
+        if entry is not None and now - entry.created_at > self.ttl_seconds:
+            db.delete(entry)
+            db.commit()
+            entry = None
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        score = entry.score
+        if now - entry.last_accessed > TOUCH_INTERVAL_SECONDS:
+            entry.last_accessed = now
+            db.commit()
+        with self._lock:
+            self.hits += 1
+        return score
+
+    def get_many(self, db: Session, keys: List[str]) -> Dict[str, int]:
+        """Look up several keys in one query; returns only the live hits"""
+        if not keys:
+            return {}
+        now = time.time()
+        entries = db.query(MatchScoreCacheEntry).filter(MatchScoreCacheEntry.key.in_(keys)).all()
+        found = {}
+        stale = False
+        for entry in entries:
+            if now - entry.created_at > self.ttl_seconds:
+                continue
+            found[entry.key] = entry.score
+            if now - entry.last_accessed > TOUCH_INTERVAL_SECONDS:
+                entry.last_accessed = now
+                stale = True
+        if stale:
+            db.commit()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, db: Session, key: str, score: int):
+        self.set_many(db, {key: score})
+
+    def set_many(self, db: Session, scores: Dict[str, int]):
+        """Store several scores in one transaction"""
+        if not scores:
+            return
+        now = time.time()
+        for key, score in scores.items():
+            db.merge(MatchScoreCacheEntry(key=key, score=score, created_at=now, last_accessed=now))
+        db.commit()
+        with self._lock:
+            before = self._inserts
+            self._inserts += len(scores)
+            sweep = before // EVICTION_CHECK_EVERY != self._inserts // EVICTION_CHECK_EVERY
+        if sweep:
+            self.evict(db)
+
+    def evict(self, db: Session) -> int:
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        removed = (
+            db.query(MatchScoreCacheEntry)
+            .filter(MatchScoreCacheEntry.created_at < time.time() - self.ttl_seconds)
+            .delete(synchronize_session=False)
+        )
+        overflow = db.query(func.count(MatchScoreCacheEntry.key)).scalar() - self.max_entries
+        if overflow > 0:
+            oldest = (
+                db.query(MatchScoreCacheEntry.key)
+                .order_by(MatchScoreCacheEntry.last_accessed)
+                .limit(overflow)
+                .subquery()
+            )
+            removed += (
+                db.query(MatchScoreCacheEntry)
+                .filter(MatchScoreCacheEntry.key.in_(oldest.select()))
+                .delete(synchronize_session=False)
+            )
+        db.commit()
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self, db: Session) -> dict:
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "evictions": evictions,
+            "entries": db.query(func.count(MatchScoreCacheEntry.key)).scalar(),
+        }
+
+
+match_score_cache = MatchScoreCache()
+
+
+async def get_cached_match_score(db: AsyncSession, startup: Startup, preferences: dict) -> int:
+    """Match score from the cache, computing and storing it with the LLM on a miss"""
+    # Detach so cache commits don't expire the attributes the prompt needs
+    db.expunge(startup)
+    key = cache_key(startup, preferences)
+    score = await db.run_sync(match_score_cache.get, key)
+    # Hand the pooled connection back before awaiting the LLM: otherwise the handler
+    # keeps it until dependency teardown, and enough concurrent requests exhaust the pool
+    await db.close()
+    if score is not None:
+        return score
+
+    try:
+        score = await calculate_match_score(startup, preferences)
+    except Exception as e:
+        print(f"Error calculating match score: {e}")
+        return FALLBACK_SCORE  # not cached, so the next request retries
+    await db.run_sync(match_score_cache.set, key, score)
+    return score
+
+
+async def stream_match_scores(startups: List[Startup], preferences: dict) -> AsyncIterator[dict]:
+    """Yield {startup_id, match_score, cached} as each score becomes available.
+
+    Cached scores come out first; misses are packed PACK_SIZE to a prompt and the
+    packs run concurrently, so results stream in as each LLM call returns.
+    `startups` must already be loaded (they are read after their session closes).
+    """
+    keys = {startup.id: cache_key(startup, preferences) for startup in startups}
+    async with AsyncSessionLocal() as db:
+        cached = await db.run_sync(match_score_cache.get_many, list(keys.values()))
+
+    misses = []
+    for startup in startups:
+        if keys[startup.id] in cached:
+            yield {"startup_id": startup.id, "match_score": cached[keys[startup.id]], "cached": True}
+        else:
+            misses.append(startup)
+
+    async def score_pack(pack: List[Startup]):
+        try:
+            return pack, await calculate_match_scores(pack, preferences)
+        except Exception as e:
+            print(f"Error calculating match scores for {len(pack)} startups: {e}")
+            return pack, {}
+
+    tasks = [asyncio.ensure_future(score_pack(misses[i:i + PACK_SIZE])) for i in range(0, len(misses), PACK_SIZE)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            pack, scores = await next_done
+            if scores:
+                async with AsyncSessionLocal() as db:
+                    await db.run_sync(match_score_cache.set_many,
+                                      {keys[startup_id]: score for startup_id, score in scores.items()})
+            for startup in pack:
+                if startup.id in scores:
+                    yield {"startup_id": startup.id, "match_score": scores[startup.id], "cached": False}
+                else:
+                    # The LLM skipped or failed on this one; the fallback is not cached
+                    yield {"startup_id": startup.id, "match_score": FALLBACK_SCORE, "cached": False}
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,129 @@
+import os
+import time
+
+from sqlalchemy import func, inspect, select, text
+
+from backend.analysis_cache import profile_hash
+from backend.crud import rebuild_analytics_summary
+from backend.database import Base, SessionLocal
+from backend.embedding_store import migrate_json_embeddings
+from backend.models import Startup, UserSave, split_location
+from backend.search_index import ensure_search_index
+from backend.users import DEFAULT_USER_ID
+
+
+def add_missing_columns(engine):
+    """Add columns declared on the models but missing from existing tables"""
+    with engine.begin() as conn:
+        # Inspect through the same connection: the write pool holds only one
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def duplicate_values(conn, table, columns, limit: int = 5) -> list:
+    """Up to `limit` value tuples shared by more than one row, which block a unique index"""
+    query = select(*columns).select_from(table).group_by(*columns).having(func.count() > 1).limit(limit)
+    return [tuple(row) for row in conn.execute(query)]
+
+
+def create_missing_indexes(engine):
+    """Create indexes declared on the models that existing tables don't have yet.
+
+    A unique index is skipped, with the conflicting values reported, while the table
+    still holds duplicates; it is created on the first start after they are removed.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.unique:
+                    duplicates = duplicate_values(conn, table, list(index.columns))
+                    if duplicates:
+                        columns = ", ".join(column.name for column in index.columns)
+                        print(f"Not creating unique index {index.name}: {table.name} has duplicate ({columns}) "
+                              f"values, e.g. {duplicates}. Remove the duplicates and restart to create it.")
+                        continue
+                index.create(bind=conn)
+
+
+def backfill_location_columns(db) -> int:
+    """Populate normalized city/state for rows created before those columns existed"""
+    rows = db.query(Startup.id, Startup.location).filter(Startup.city.is_(None), Startup.location.isnot(None)).all()
+    mappings = []
+    for startup_id, location in rows:
+        city, state = split_location(location)
+        if city:
+            mappings.append({"id": startup_id, "city": city, "state": state})
+    if mappings:
+        db.bulk_update_mappings(Startup, mappings)
+        db.commit()
+    return len(mappings)
+
+
+def migrate_legacy_saves(db) -> int:
+    """Move the old global startups.is_saved flags into the default user's saved list"""
+    ids = [startup_id for startup_id, in db.query(Startup.id).filter(Startup.is_saved == True).all()]
+    if not ids:
+        return 0
+    existing = {
+        startup_id for startup_id, in
+        db.query(UserSave.startup_id).filter(UserSave.user_id == DEFAULT_USER_ID, UserSave.startup_id.in_(ids)).all()
+    }
+    now = time.time()
+    db.bulk_insert_mappings(UserSave, [
+        {"user_id": DEFAULT_USER_ID, "startup_id": startup_id, "created_at": now}
+        for startup_id in ids if startup_id not in existing
+    ])
+    db.query(Startup).filter(Startup.id.in_(ids)).update({Startup.is_saved: False}, synchronize_session=False)
+    db.commit()
+    return len(ids)
+
+
+def backfill_analysis_hashes(db) -> int:
+    """Record the profile hash of analyses written before hashes were stored.
+
+    They are assumed to match the current profile, so they aren't all regenerated at once.
+    """
+    rows = db.query(Startup).filter(Startup.ai_summary.isnot(None), Startup.ai_summary_hash.is_(None)).all()
+    if rows:
+        db.bulk_update_mappings(Startup, [{"id": startup.id, "ai_summary_hash": profile_hash(startup)} for startup in rows])
+        db.commit()
+    return len(rows)
+
+
+def run_migrations(engine):
+    """Bring an existing database up to the current schema and storage formats"""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    if ensure_search_index(engine):
+        print("Built the startup search index")
+
+    db = SessionLocal()
+    try:
+        backfill_location_columns(db)
+        migrate_legacy_saves(db)
+        backfill_analysis_hashes(db)
+        rebuild_analytics_summary(db)  # resync in case rows changed outside the API
+        converted = migrate_json_embeddings(db, dtype=os.getenv("EMBEDDING_STORAGE_DTYPE", "float32"))
+        if converted:
+            print(f"Converted {converted} JSON embeddings to binary storage")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from backend.database import engine
+
+    run_migrations(engine)
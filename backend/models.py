@@ -1,22 +1,168 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text
+from typing import Optional, Tuple
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, LargeBinary, Index, ForeignKey
+from sqlalchemy.orm import validates
 from backend.database import Base
 
+def split_location(location: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Normalize "San Francisco, CA" to ("san francisco", "ca") for indexed matching"""
+    if not location:
+        return None, None
+    city, _, state = location.partition(",")
+    return city.strip().lower() or None, state.strip().lower() or None
+
 class Startup(Base):
     __tablename__ = "startups"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    sector = Column(String, nullable=False)
+    sector = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=False)
     valuation = Column(Float, nullable=False)  # in millions
     revenue = Column(Float, nullable=False)  # in millions
     growth_rate = Column(Float, nullable=False)  # percentage
-    funding_stage = Column(String, nullable=False)
+    funding_stage = Column(String, nullable=False, index=True)
     employees = Column(Integer, nullable=False)
     website = Column(String, nullable=True)
     location = Column(String, nullable=False)
+    city = Column(String, nullable=True, index=True)  # normalized from location
+    state = Column(String, nullable=True, index=True)  # normalized from location
     user_interest_score = Column(Float, default=0.0)
     ai_summary = Column(Text, nullable=True)  # JSON string
-    similarity_vector = Column(Text, nullable=True)  # JSON string for embeddings
-    is_saved = Column(Boolean, default=False)
+    ai_summary_hash = Column(String, nullable=True)  # profile hash the summary was generated from
+    ai_summary_status = Column(String, nullable=True)  # "pending" while a worker is generating
+    ai_summary_lease_until = Column(Float, nullable=True)  # unix timestamp the pending claim expires
+    similarity_vector = Column(Text, nullable=True)  # legacy JSON embeddings, migrated to `embedding`
+    embedding = Column(LargeBinary, nullable=True)  # raw little-endian float bytes
+    embedding_dim = Column(Integer, nullable=True)
+    embedding_dtype = Column(String, nullable=True)  # float32 or float16
+    embedding_model = Column(String, nullable=True)
+    embedded_at = Column(Float, nullable=True)  # unix timestamp the embedding was written
+    is_saved = Column(Boolean, default=False)  # legacy global flag, migrated to user_saves
+
+    __table_args__ = (
+        Index("ix_startups_sector_funding_stage", "sector", "funding_stage"),
+        Index("ux_startups_name", "name", unique=True),  # catalog imports upsert by name
+    )
+
+    @validates("location")
+    def _normalize_location(self, key, location):
+        self.city, self.state = split_location(location)
+        return location
+
+
+class MatchScoreCacheEntry(Base):
+    __tablename__ = "match_score_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of startup profile, preferences, model and prompt version
+    score = Column(Integer, nullable=False)
+    created_at = Column(Float, nullable=False)  # unix timestamp
+    last_accessed = Column(Float, nullable=False, index=True)  # unix timestamp, drives LRU eviction
+
+
+class QueryEmbeddingCacheEntry(Base):
+    __tablename__ = "query_embedding_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of embedding model and normalized query text
+    query = Column(Text, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # raw little-endian float32 bytes
+    embedding_dim = Column(Integer, nullable=False)
+    embedding_model = Column(String, nullable=False)
+    created_at = Column(Float, nullable=False)  # unix timestamp
+    last_accessed = Column(Float, nullable=False, index=True)  # unix timestamp, drives LRU eviction
+
+
+class StartupNeighbor(Base):
+    __tablename__ = "startup_neighbors"
+
+    # Precomputed top-k most similar startups, one row per (startup, list, rank)
+    startup_id = Column(Integer, ForeignKey("startups.id"), primary_key=True)
+    same_sector = Column(Boolean, primary_key=True)  # the list restricted to the startup's own sector
+    rank = Column(Integer, primary_key=True)  # 0 is the most similar
+    neighbor_id = Column(Integer, ForeignKey("startups.id"), nullable=False, index=True)
+    similarity = Column(Float, nullable=False)  # cosine similarity of the two embeddings
+
+    __table_args__ = (
+        # Covers reading the last entry of every list, to find whose lists a new embedding enters
+        Index("ix_startup_neighbors_rank", "rank", "same_sector", "similarity"),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class SectorSimilarity(Base):
+    __tablename__ = "sector_similarities"
+
+    # Each embedded startup's dot product with every sector's mean embedding, so the
+    # personalized rank can add its similarity term in SQL
+    sector = Column(String, primary_key=True)  # keyed sector-first: a ranking reads one sector's rows at a time
+    startup_id = Column(Integer, ForeignKey("startups.id"), primary_key=True)
+    similarity = Column(Float, nullable=False)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class SectorGram(Base):
+    __tablename__ = "sector_gram"
+
+    # Dot products between sector mean embeddings, to normalize a sum of sector_similarities
+    sector = Column(String, primary_key=True)
+    other_sector = Column(String, primary_key=True)
+    dot = Column(Float, nullable=False)
+
+
+class AnalyticsSummary(Base):
+    __tablename__ = "analytics_summary"
+
+    # One row per (dimension, value), e.g. ("sector", "FinTech") or ("funding_stage", "Seed")
+    dimension = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    startup_count = Column(Integer, nullable=False, default=0)
+    growth_total = Column(Float, nullable=False, default=0.0)  # sum of growth_rate, for averages
+    saved_count = Column(Integer, nullable=False, default=0)  # saves across all users
+
+
+class UserSave(Base):
+    __tablename__ = "user_saves"
+
+    user_id = Column(String, primary_key=True)
+    startup_id = Column(Integer, ForeignKey("startups.id"), primary_key=True)
+    created_at = Column(Float, nullable=False)  # unix timestamp
+
+    __table_args__ = (
+        Index("ix_user_saves_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class SwipeEvent(Base):
+    __tablename__ = "swipe_events"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False)
+    startup_id = Column(Integer, ForeignKey("startups.id"), nullable=False)
+    direction = Column(String, nullable=False)  # "left" or "right"
+    created_at = Column(Float, nullable=False)  # unix timestamp
+
+    __table_args__ = (
+        Index("ix_swipe_events_user_id_startup_id", "user_id", "startup_id"),
+        Index("ix_swipe_events_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class UserPreference(Base):
+    __tablename__ = "user_preferences"
+
+    user_id = Column(String, primary_key=True)
+    preferences = Column(Text, nullable=False)  # JSON string of the onboarding survey answers
+    updated_at = Column(Float, nullable=False)  # unix timestamp
+
+
+class UserProfile(Base):
+    __tablename__ = "user_profiles"
 
+    user_id = Column(String, primary_key=True)
+    affinities = Column(Text, nullable=False)  # JSON {dimension: {value: weight in [-1, 1]}} learned from swipes
+    vector = Column(LargeBinary, nullable=True)  # decayed mean of right-swiped embeddings, float32
+    vector_dim = Column(Integer, nullable=True)
+    vector_model = Column(String, nullable=True)  # embedding model of the swiped vectors; another model's is discarded
+    swipe_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False)  # unix timestamp
@@ -0,0 +1,352 @@
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, aliased
+
+from backend.embedding_index import EmbeddingIndex, embedding_index
+from backend.embedding_providers import embedding_provider
+from backend.models import Startup, StartupNeighbor
+
+LIST_SIZE = int(os.getenv("NEIGHBOR_LIST_SIZE", "20"))  # neighbors stored per startup, overall and within its sector
+ROW_BLOCK = 256  # startups whose lists are computed together
+COLUMN_BLOCK = 16384  # catalog rows scored per step: a ROW_BLOCK x COLUMN_BLOCK float32 block is 16MB
+REFRESH_BLOCK = 64  # changed startups scored against the whole catalog at once when refreshing
+SCOPES = (False, True)  # StartupNeighbor.same_sector: all sectors, then the startup's own sector
+ID_CHUNK = 500  # ids per IN (...) clause
+
+INSERT_COLUMNS = ("startup_id", "same_sector", "rank", "neighbor_id", "similarity")
+_INSERT_SQL = (f"INSERT INTO {StartupNeighbor.__tablename__} ({', '.join(INSERT_COLUMNS)}) "
+               f"VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})")
+
+
+def _merge_top(best_scores: np.ndarray, best_positions: np.ndarray, scores: np.ndarray,
+               positions: np.ndarray, k: int):
+    """Fold a block of scores into each row's running top k, in place"""
+    if scores.shape[1] > k:
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        scores = np.take_along_axis(scores, top, axis=1)
+        positions = positions[top]
+    else:
+        positions = np.broadcast_to(positions, scores.shape)
+    scores = np.concatenate([best_scores, scores], axis=1)
+    positions = np.concatenate([best_positions, positions], axis=1)
+    top = np.argpartition(scores, -k, axis=1)[:, -k:]
+    best_scores[:] = np.take_along_axis(scores, top, axis=1)
+    best_positions[:] = np.take_along_axis(positions, top, axis=1)
+
+
+def top_neighbors(matrix: np.ndarray, rows: np.ndarray, columns: Optional[np.ndarray] = None, k: int = LIST_SIZE,
+                  column_block: int = COLUMN_BLOCK) -> Tuple[np.ndarray, np.ndarray]:
+    """The k rows of `matrix` most similar to each of `rows`, among the sorted positions `columns` (default all).
+
+    Returns (positions, similarities), each len(rows) x k, best first; slots past the
+    last available neighbor hold position -1 and similarity -inf. Candidates are scored
+    one column block at a time, so memory is bounded whatever the catalog size.
+    """
+    queries = matrix[rows]
+    best_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    best_positions = np.full((len(rows), k), -1, dtype=np.int64)
+    n_columns = len(matrix) if columns is None else len(columns)
+    for start in range(0, n_columns, column_block):
+        stop = min(start + column_block, n_columns)
+        if columns is None:
+            block, candidates = np.arange(start, stop), matrix[start:stop]
+        else:
+            block = columns[start:stop]
+            candidates = matrix[block]
+        scores = queries @ candidates.T
+        at = np.searchsorted(block, rows)
+        own = (at < len(block)) & (block[np.minimum(at, len(block) - 1)] == rows)
+        scores[np.nonzero(own)[0], at[own]] = -np.inf  # a startup is not its own neighbor
+        _merge_top(best_scores, best_positions, scores, block, k)
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    positions, scores = np.take_along_axis(best_positions, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+    positions[np.isneginf(scores)] = -1  # the row itself, when there are fewer than k candidates
+    return positions, scores
+
+
+def _fetch_raw(db: Session, sql: str, params: tuple = ()) -> List[tuple]:
+    """Rows as plain DBAPI tuples: whole-catalog reads skip the per-row Result overhead"""
+    cursor = db.connection().connection.cursor()
+    try:
+        return cursor.execute(sql, params).fetchall()
+    finally:
+        cursor.close()
+
+
+def _locate(lookup: np.ndarray, startup_ids) -> np.ndarray:
+    """Index positions of `startup_ids` through a position-by-id array, -1 for ids not in it"""
+    startup_ids = np.asarray(startup_ids, dtype=np.int64)
+    inside = (startup_ids >= 0) & (startup_ids < len(lookup))
+    return np.where(inside, lookup[np.where(inside, startup_ids, 0)], -1)
+
+
+def sector_codes(db: Session, ids: np.ndarray) -> np.ndarray:
+    """An integer per distinct sector, for each startup id in `ids`"""
+    sectors = dict(_fetch_raw(db, "SELECT id, sector FROM startups"))
+    codes: Dict[Optional[str], int] = {}
+    return np.array([codes.setdefault(sectors.get(int(i)), len(codes)) for i in ids], dtype=np.int32)
+
+
+def _chunks(values: Sequence[int]) -> Iterable[Sequence[int]]:
+    for start in range(0, len(values), ID_CHUNK):
+        yield values[start:start + ID_CHUNK]
+
+
+def _replace_lists(db: Session, startup_ids: Sequence[int], rows: List[tuple]):
+    """Swap the stored lists of `startup_ids` for `rows` (INSERT_COLUMNS tuples); the caller commits"""
+    for chunk in _chunks(startup_ids):
+        db.query(StartupNeighbor).filter(StartupNeighbor.startup_id.in_(chunk)).delete(synchronize_session=False)
+    if rows:
+        # executemany over plain tuples: a full build writes millions of rows
+        db.connection().exec_driver_sql(_INSERT_SQL, rows)
+
+
+def _list_rows(ids: np.ndarray, rows: np.ndarray, same_sector: bool, positions: np.ndarray,
+               similarities: np.ndarray) -> List[tuple]:
+    """Rows to store for the top_neighbors() result of `rows`"""
+    row, rank = np.nonzero(positions >= 0)  # missing neighbors only ever trail a list
+    return list(zip(ids[rows[row]].tolist(), [same_sector] * len(row), rank.tolist(),
+                    ids[positions[row, rank]].tolist(), similarities[row, rank].tolist()))
+
+
+def _sector_positions(codes: np.ndarray) -> List[np.ndarray]:
+    """Sorted positions of each sector's startups, indexed by sector code"""
+    order = np.argsort(codes, kind="stable")
+    return np.split(order, np.cumsum(np.bincount(codes))[:-1])
+
+
+def _compute_lists(matrix: np.ndarray, ids: np.ndarray, codes: np.ndarray, by_sector: List[np.ndarray],
+                   rows: np.ndarray, k: int) -> List[tuple]:
+    """Both lists of every startup in `rows`; same-sector lists only score their sector's rows"""
+    rows = rows[np.argsort(codes[rows], kind="stable")]
+    lists = []
+    for start in range(0, len(rows), ROW_BLOCK):
+        block = rows[start:start + ROW_BLOCK]
+        lists += _list_rows(ids, block, False, *top_neighbors(matrix, block, k=k))
+        for code in np.unique(codes[block]):
+            sector_rows = block[codes[block] == code]
+            lists += _list_rows(ids, sector_rows, True, *top_neighbors(matrix, sector_rows, by_sector[code], k=k))
+    return lists
+
+
+def neighbors_built(db: Session) -> bool:
+    return db.query(StartupNeighbor.startup_id).first() is not None
+
+
+def build_neighbors(db: Session, index: EmbeddingIndex = embedding_index, k: int = LIST_SIZE,
+                    progress_every: int = 0) -> dict:
+    """Compute and store every embedded startup's neighbor lists (a blocked all-pairs product).
+
+    Lists are committed ROW_BLOCK startups at a time, so a running server
+    keeps serving the previous lists for the rest while a rebuild is in progress.
+    """
+    started = time.perf_counter()
+    matrix, ids, _ = index.snapshot()
+    codes = sector_codes(db, ids)
+    by_sector = _sector_positions(codes)
+    # Sector by sector, so each block's same-sector lists score a single sector's rows
+    order = np.concatenate(by_sector) if by_sector else np.zeros(0, dtype=np.int64)
+    for start in range(0, len(ids), ROW_BLOCK):
+        block = order[start:start + ROW_BLOCK]
+        lists = _compute_lists(matrix, ids, codes, by_sector, block, k)
+        _replace_lists(db, ids[block].tolist(), lists)  # computed first: the write lock is held only to store them
+        db.commit()
+        done = min(start + ROW_BLOCK, len(ids))
+        if progress_every and done // progress_every != start // progress_every:
+            print(f"{done} startups, {done / (time.perf_counter() - started):.0f} startups/s")
+    # Lists of startups no longer in the index
+    indexed = set(ids.tolist())
+    listed = {startup_id for startup_id, in db.query(StartupNeighbor.startup_id).filter(StartupNeighbor.rank == 0)}
+    _replace_lists(db, sorted(listed - indexed), [])
+    db.commit()
+    return {"startups": len(ids), "seconds": round(time.perf_counter() - started, 3)}
+
+
+def refresh_neighbors(db: Session, startup_ids: Iterable[int], index: EmbeddingIndex = embedding_index,
+                      k: int = LIST_SIZE) -> int:
+    """Update the stored lists after `startup_ids` were added to `index` or re-embedded.
+
+    Their own lists are recomputed. Any other list whose last entry is less similar than
+    one of them takes it in, which is exact without rescanning the catalog; lists that
+    already held one of them are recomputed, since a re-embedded startup may have dropped
+    out. Does nothing before build_neighbors has run. Returns the number of lists rewritten.
+    """
+    if not neighbors_built(db):
+        return 0
+    matrix, ids, _ = index.snapshot()
+    if not len(ids):
+        return 0
+    lookup = np.full(int(ids.max()) + 1, -1, dtype=np.int64)
+    lookup[ids] = np.arange(len(ids))
+    changed = np.unique(_locate(lookup, list(startup_ids)))
+    changed = changed[changed >= 0]
+    if not changed.size:
+        return 0
+    codes = sector_codes(db, ids)
+
+    holders = []
+    for chunk in _chunks(ids[changed].tolist()):
+        holders += [startup_id for startup_id, in db.query(StartupNeighbor.startup_id)
+                    .filter(StartupNeighbor.neighbor_id.in_(chunk)).distinct()]
+    recompute = np.union1d(changed, _locate(lookup, holders))
+    recompute = recompute[recompute >= 0]
+
+    # Which indexed startups have lists, and how similar the last entry of each full list is;
+    # a list that isn't full holds every candidate, so it takes any newcomer
+    table = StartupNeighbor.__tablename__
+    listed = np.zeros(len(ids), dtype=bool)
+    positions = _locate(lookup, [startup_id for startup_id, in _fetch_raw(
+        db, f"SELECT startup_id FROM {table} WHERE rank = 0 AND same_sector = 0")])
+    listed[positions[positions >= 0]] = True
+    listed[recompute] = False
+    last = {}
+    for scope in SCOPES:
+        entries = np.array(_fetch_raw(
+            db, f"SELECT startup_id, similarity FROM {table} WHERE rank = ? AND same_sector = ?", (k - 1, scope),
+        ), dtype=np.float64).reshape(-1, 2)
+        positions = _locate(lookup, entries[:, 0].astype(np.int64))
+        last[scope] = np.full(len(ids), -np.inf, dtype=np.float32)
+        last[scope][positions[positions >= 0]] = entries[positions >= 0, 1]
+
+    additions: Dict[int, Dict[bool, List[Tuple[int, float]]]] = {}
+    for start in range(0, len(changed), REFRESH_BLOCK):
+        block = changed[start:start + REFRESH_BLOCK]
+        scores = matrix[block] @ matrix.T
+        for scope in SCOPES:
+            if scope:
+                scores[codes[block][:, None] != codes] = -np.inf
+            for i, position in zip(*np.nonzero((scores > last[scope]) & listed)):
+                additions.setdefault(int(position), {}).setdefault(scope, []).append(
+                    (int(ids[block[i]]), float(scores[i, position])))
+
+    merged_ids = [int(ids[p]) for p in additions]
+    lists: Dict[Tuple[int, bool], List[Tuple[int, float]]] = {}
+    for chunk in _chunks(merged_ids):
+        stored = (db.query(StartupNeighbor.startup_id, StartupNeighbor.same_sector, StartupNeighbor.neighbor_id,
+                           StartupNeighbor.similarity)
+                  .filter(StartupNeighbor.startup_id.in_(chunk))
+                  .order_by(StartupNeighbor.rank))
+        for startup_id, scope, neighbor_id, similarity in stored:
+            lists.setdefault((startup_id, scope), []).append((neighbor_id, similarity))
+    rows = []
+    for startup_id in merged_ids:
+        for scope in SCOPES:
+            merged = lists.get((startup_id, scope), []) + additions[int(lookup[startup_id])].get(scope, [])
+            merged.sort(key=lambda entry: -entry[1])
+            rows.extend((startup_id, scope, rank, neighbor_id, similarity)
+                        for rank, (neighbor_id, similarity) in enumerate(merged[:k]))
+    rows += _compute_lists(matrix, ids, codes, _sector_positions(codes), recompute, k)
+    _replace_lists(db, merged_ids + ids[recompute].tolist(), rows)
+    db.commit()
+    return len(merged_ids) + len(recompute)
+
+
+def stored_similar_startups(db: Session, startup_id: int, limit: int = 3, same_sector: bool = False,
+                            exclude_ids: Iterable[int] = ()) -> Optional[List[Tuple[Startup, float]]]:
+    """Similar startups from the stored lists, in one indexed query.
+
+    None when the lists can't answer and the caller should search live: the startup has no
+    list yet (or only one computed from another provider's embeddings), `limit` exceeds the
+    list size, or exclusions leave too few entries.
+    """
+    if limit > LIST_SIZE:
+        return None
+    exclude = set(exclude_ids)
+    target = aliased(Startup)
+    query = (
+        db.query(Startup, StartupNeighbor.similarity)
+        .join(StartupNeighbor, StartupNeighbor.neighbor_id == Startup.id)
+        .join(target, target.id == StartupNeighbor.startup_id)
+        .filter(StartupNeighbor.startup_id == startup_id, StartupNeighbor.same_sector == same_sector,
+                target.embedding_model == embedding_provider.name)
+        .order_by(StartupNeighbor.rank)
+    )
+    rows = query.all() if exclude else query.limit(limit).all()
+    if not rows:
+        return None
+    similar = [(startup, similarity) for startup, similarity in rows if startup.id not in exclude]
+    if len(similar) < limit and len(rows) == LIST_SIZE:
+        return None  # the list is full, so more neighbors exist past its end
+    return similar[:limit]
+
+
+def benchmark(n: int = 100000, dim: int = 1536, n_sectors: int = 11, n_updates: int = 20, seed: int = 0):
+    """Bulk build throughput, incremental update latency, lookup latency and exactness on synthetic data"""
+    from backend.database import Base, make_engine
+
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = make_engine(f"sqlite:///{workdir}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Startup), [
+                {"id": i, "name": f"Startup {i}", "sector": f"Sector {i % n_sectors}", "description": "",
+                 "valuation": 100.0, "revenue": 10.0, "growth_rate": 0.0, "funding_stage": "Seed",
+                 "employees": 10, "location": "Austin, TX", "user_interest_score": 0, "is_saved": False}
+                for i in range(1, n + 1)
+            ])
+        index = EmbeddingIndex()
+        index.load(zip(range(1, n + 1), rng.normal(size=(n, dim)).astype(np.float32)))
+        db = Session(bind=engine)
+        try:
+            stats = build_neighbors(db, index)
+            print(f"Built lists for {n} startups in {stats['seconds']}s ({n / stats['seconds']:.0f} startups/s)")
+
+            latencies = []
+            for startup_id in rng.integers(1, n + 1, n_updates):
+                index.upsert(int(startup_id), rng.normal(size=dim))
+                started = time.perf_counter()
+                refresh_neighbors(db, [int(startup_id)], index)
+                latencies.append(1000 * (time.perf_counter() - started))
+            print(f"Re-embedding one startup: p50 {np.percentile(latencies, 50):.1f} ms, "
+                  f"max {max(latencies):.1f} ms to refresh the lists")
+
+            matrix, ids, _ = index.snapshot()
+            codes = sector_codes(db, ids)
+            by_sector = _sector_positions(codes)
+            mismatches, latencies = 0, []
+            for position in rng.choice(n, 200, replace=False):
+                for scope in SCOPES:
+                    started = time.perf_counter()
+                    similar = stored_similar_startups(db, int(ids[position]), limit=LIST_SIZE, same_sector=scope)
+                    latencies.append(1000 * (time.perf_counter() - started))
+                    columns = by_sector[codes[position]] if scope else None
+                    expected, _ = top_neighbors(matrix, np.array([position]), columns)
+                    mismatches += [startup.id for startup, _ in similar or []] != [int(ids[p]) for p in expected[0] if p >= 0]
+            print(f"Lookup of {LIST_SIZE} neighbors: p50 {np.percentile(latencies, 50):.2f} ms; "
+                  f"{mismatches} of {len(latencies)} sampled lists differ from a full recompute")
+        finally:
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the precomputed similar-startup lists")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="recompute every startup's lists from stored embeddings")
+    build_parser.add_argument("--progress-every", type=int, default=10000)
+    bench_parser = subparsers.add_parser("bench", help="build, refresh and lookup timings on a synthetic catalog")
+    bench_parser.add_argument("--n", type=int, default=100000)
+    bench_parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from backend.database import SessionLocal, engine
+        from backend.migrations import run_migrations
+
+        run_migrations(engine)
+        db = SessionLocal()
+        try:
+            embedding_index.load_from_db(db)
+            print(build_neighbors(db, progress_every=args.progress_every))
+        finally:
+            db.close()
+    else:
+        benchmark(n=args.n, dim=args.dim)
@@ -1,158 +1,162 @@
-import os
 import json
-from openai import OpenAI
 from backend.models import Startup
-from typing import List, Tuple
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from backend.embedding_index import embedding_index
+from backend.ann_index import SIMILARITY_BACKEND, ann_index
+from backend.ai_client import chat_completion
+from typing import Dict, Iterable, List, Optional, Tuple
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+ANALYSIS_MODEL = "gpt-4o-mini"
+ANALYSIS_PROMPT_VERSION = 1  # bump whenever the analysis prompt changes
 
-def generate_embedding(text: str) -> List[float]:
-    """Generate embedding vector for text using OpenAI"""
-    try:
-        response = client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error generating embedding: {e}")
-        return []
+FALLBACK_ANALYSIS = {
+    "strengths": ["Innovative product", "Strong team", "Growing market"],
+    "risks": ["Market competition", "Scaling challenges", "Regulatory concerns"],
+    "market_opportunity": "The market shows significant growth potential with increasing demand.",
+    "recommendation": "Hold",
+    "confidence_score": 0.7
+}
 
-def analyze_startup(startup: Startup) -> dict:
-    """Generate AI analysis for a startup"""
-    try:
-        prompt = f"""
-        Analyze this startup and provide a structured investment analysis:
-        
-        Company: {startup.name}
-        Sector: {startup.sector}
-        Description: {startup.description}
-        Valuation: ${startup.valuation}M
-        Revenue: ${startup.revenue}M ARR
-        Growth Rate: {startup.growth_rate}% YoY
-        Funding Stage: {startup.funding_stage}
-        Employees: {startup.employees}
-        Location: {startup.location}
-        
-        Provide a JSON response with:
-        - strengths: array of 3 key strengths
-        - risks: array of 3 potential risks
-        - market_opportunity: brief market analysis (1-2 sentences)
-        - recommendation: investment recommendation (Buy, Hold, or Pass)
-        - confidence_score: confidence in recommendation (0-1)
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert venture capital analyst providing structured investment insights."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-        
-        analysis = json.loads(response.choices[0].message.content)
-        return analysis
-    except Exception as e:
-        print(f"Error analyzing startup: {e}")
-        return {
-            "strengths": ["Innovative product", "Strong team", "Growing market"],
-            "risks": ["Market competition", "Scaling challenges", "Regulatory concerns"],
-            "market_opportunity": "The market shows significant growth potential with increasing demand.",
-            "recommendation": "Hold",
-            "confidence_score": 0.7
-        }
+async def generate_startup_analysis(startup: Startup, max_retries: Optional[int] = None) -> dict:
+    """Generate AI analysis for a startup; raises if the model call fails"""
+    prompt = f"""
+    Analyze this startup and provide a structured investment analysis:
+    
+    Company: {startup.name}
+    Sector: {startup.sector}
+    Description: {startup.description}
+    Valuation: ${startup.valuation}M
+    Revenue: ${startup.revenue}M ARR
+    Growth Rate: {startup.growth_rate}% YoY
+    Funding Stage: {startup.funding_stage}
+    Employees: {startup.employees}
+    Location: {startup.location}
+    
+    Provide a JSON response with:
+    - strengths: array of 3 key strengths
+    - risks: array of 3 potential risks
+    - market_opportunity: brief market analysis (1-2 sentences)
+    - recommendation: investment recommendation (Buy, Hold, or Pass)
+    - confidence_score: confidence in recommendation (0-1)
+    """
+    
+    content = await chat_completion(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": "You are an expert venture capital analyst providing structured investment insights."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_retries=max_retries
+    )
+    
+    return json.loads(content)
 
 def get_startup_embedding_text(startup: Startup) -> str:
     """Create text representation of startup for embedding"""
     return f"{startup.name} {startup.sector} {startup.description} {startup.location} {startup.funding_stage}"
 
-def calculate_similarity(vector1: List[float], vector2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors"""
-    if not vector1 or not vector2:
-        return 0.0
-    
-    v1 = np.array(vector1).reshape(1, -1)
-    v2 = np.array(vector2).reshape(1, -1)
+def find_similar_startups(db, target_startup: Startup, limit: int = 3, same_sector: bool = False,
+                          exclude_ids: Iterable[int] = ()) -> List[Tuple[Startup, float]]:
+    """Find similar startups based on embeddings, optionally within the target's sector"""
+    # Embeddings are generated offline by backend.embedding_backfill, never inline here
+    vector = embedding_index.get_vector(target_startup.id)
+    if vector is None:
+        return []
+    exclude = {target_startup.id, *exclude_ids}
+    sector = target_startup.sector if same_sector else None
+    if SIMILARITY_BACKEND == "ivf" and ann_index.ready:
+        neighbors = ann_index.search(vector, limit=limit, sector=sector, exclude=exclude)
+    else:
+        # Exact: a single matrix-vector product over the catalog (or just the sector's rows)
+        only = [startup_id for startup_id, in db.query(Startup.id).filter(Startup.sector == sector)] if sector else None
+        neighbors = embedding_index.search(vector, limit=limit, exclude=exclude, only=only)
+    if not neighbors:
+        return []
     
-    return float(cosine_similarity(v1, v2)[0][0])
+    startups = db.query(Startup).filter(Startup.id.in_([startup_id for startup_id, _ in neighbors])).all()
+    by_id = {startup.id: startup for startup in startups}
+    return [(by_id[startup_id], score) for startup_id, score in neighbors if startup_id in by_id]
+
+MATCH_SCORE_MODEL = "gpt-4o-mini"
+MATCH_SCORE_PROMPT_VERSION = 2  # bump whenever the match-score prompt changes
+
+def format_preferences_context(preferences: dict) -> str:
+    """Preferences block shared by the match-score prompts"""
+    return f"""
+    User Preferences:
+    - Interested Sectors: {', '.join(preferences.get('selected_sectors', []))}
+    - Work Field: {preferences.get('work_field', 'N/A')}
+    - Investment Stage: {', '.join(preferences.get('investment_stage', []))}
+    - Investment Range: {preferences.get('investment_range', 'N/A')}
+    - Risk Tolerance: {preferences.get('risk_tolerance', 'N/A')}
+    - Investment Goal: {preferences.get('investment_goal', 'N/A')}
+    - Experience Level: {preferences.get('experience_level', 'N/A')}
+    - Preferred Locations: {', '.join(preferences.get('preferred_locations', []))}
+    """
+
+def format_startup_context(startup: Startup) -> str:
+    """Startup profile block shared by the match-score prompts"""
+    return f"""
+    - Name: {startup.name}
+    - Sector: {startup.sector}
+    - Description: {startup.description}
+    - Location: {startup.location}
+    - Funding Stage: {startup.funding_stage}
+    - Valuation: ${startup.valuation}M
+    - Growth Rate: {startup.growth_rate}%
+    """
 
-def find_similar_startups(db, target_startup: Startup, limit: int = 3) -> List[Tuple[Startup, float]]:
-    """Find similar startups based on embeddings"""
-    from backend.crud import get_startups
+async def calculate_match_score(startup: Startup, preferences: dict) -> int:
+    """Ask the LLM for a 0-100 match score; raises on API or parsing errors"""
+    context = f"""
+    {format_preferences_context(preferences)}
+    Startup:
+    {format_startup_context(startup)}
+    Based on the user's preferences and this startup's profile, calculate a match score from 0-100.
+    Consider sector alignment, location preferences, funding stage match, and investment goals.
+    Return ONLY the numeric score.
+    """
     
-    # Get target embedding
-    if target_startup.similarity_vector:
-        target_vector = json.loads(target_startup.similarity_vector)
-    else:
-        text = get_startup_embedding_text(target_startup)
-        target_vector = generate_embedding(text)
+    content = await chat_completion(
+        model=MATCH_SCORE_MODEL,
+        messages=[
+            {"role": "system", "content": "You are an investment matching algorithm. Return only a number between 0-100."},
+            {"role": "user", "content": context}
+        ],
+        temperature=0.5,
+        max_tokens=10
+    )
     
-    # Get all startups
-    all_startups = db.query(Startup).filter(Startup.id != target_startup.id).all()
+    score = int(content.strip())
+    return max(0, min(100, score))  # Clamp between 0-100
+
+async def calculate_match_scores(startups: List[Startup], preferences: dict) -> Dict[int, int]:
+    """Score several startups in one LLM call; returns {startup_id: score} for those it scored"""
+    profiles = "".join(f"\n    Startup [id {startup.id}]:{format_startup_context(startup)}" for startup in startups)
+    context = f"""
+    {format_preferences_context(preferences)}
+    {profiles}
+    Based on the user's preferences, calculate a match score from 0-100 for each startup above.
+    Consider sector alignment, location preferences, funding stage match, and investment goals.
+    Return a JSON object of the form {{"scores": {{"<startup id>": <score>}}}}.
+    """
     
-    similarities = []
-    for startup in all_startups:
-        if startup.similarity_vector:
-            startup_vector = json.loads(startup.similarity_vector)
-        else:
-            text = get_startup_embedding_text(startup)
-            startup_vector = generate_embedding(text)
-            startup.similarity_vector = json.dumps(startup_vector)
-            db.commit()
-        
-        similarity = calculate_similarity(target_vector, startup_vector)
-        similarities.append((startup, similarity))
+    content = await chat_completion(
+        model=MATCH_SCORE_MODEL,
+        messages=[
+            {"role": "system", "content": "You are an investment matching algorithm. Return only JSON with scores between 0-100."},
+            {"role": "user", "content": context}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.5,
+        max_tokens=20 * len(startups) + 20
+    )
     
-    # Sort by similarity and return top N
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    return similarities[:limit]
-
-async def get_personalized_recommendations(startup: Startup, preferences: dict) -> int:
-    """Calculate personalized match score based on user preferences"""
-    try:
-        # Convert preferences dict to context string
-        context = f"""
-        User Preferences:
-        - Interested Sectors: {', '.join(preferences.get('selected_sectors', []))}
-        - Work Field: {preferences.get('work_field', 'N/A')}
-        - Investment Stage: {', '.join(preferences.get('investment_stage', []))}
-        - Investment Range: {preferences.get('investment_range', 'N/A')}
-        - Risk Tolerance: {preferences.get('risk_tolerance', 'N/A')}
-        - Investment Goal: {preferences.get('investment_goal', 'N/A')}
-        - Experience Level: {preferences.get('experience_level', 'N/A')}
-        - Preferred Locations: {', '.join(preferences.get('preferred_locations', []))}
-        
-        Startup:
-        - Name: {startup.name}
-        - Sector: {startup.sector}
-        - Description: {startup.description}
-        - Location: {startup.location}
-        - Funding Stage: {startup.funding_stage}
-        - Valuation: ${startup.valuation}M
-        - Growth Rate: {startup.growth_rate}%
-        
-        Based on the user's preferences and this startup's profile, calculate a match score from 0-100.
-        Consider sector alignment, location preferences, funding stage match, and investment goals.
-        Return ONLY the numeric score.
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an investment matching algorithm. Return only a number between 0-100."},
-                {"role": "user", "content": context}
-            ],
-            temperature=0.5,
-            max_tokens=10
-        )
-        
-        score = int(response.choices[0].message.content.strip())
-        return max(0, min(100, score))  # Clamp between 0-100
-    except Exception as e:
-        print(f"Error calculating match score: {e}")
-        return 75  # Default fallback score
-
+    raw_scores = json.loads(content).get("scores", {})
+    wanted = {startup.id for startup in startups}
+    scores = {}
+    for startup_id, score in raw_scores.items():
+        if int(startup_id) in wanted:
+            scores[int(startup_id)] = max(0, min(100, int(score)))
+    return scores
@@ -0,0 +1,42 @@
+import base64
+import json
+import math
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List) -> str:
+    """Opaque, URL-safe token for the sort key of the last row on a page"""
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], length: int) -> Optional[List]:
+    """Sort key from a cursor token, or None for the first page.
+
+    Every sort key is some finite numbers (score, rank, growth, timestamp) followed by
+    the row id, so anything else is rejected with a 400 before it reaches a query.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != length or not all(_is_number(value) for value in values) \
+            or not isinstance(values[-1], int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def set_next_cursor(response: Response, page_size: int, limit: Optional[int], last_values: Optional[List]):
+    """Advertise the next page's cursor when this page came back full"""
+    if limit and page_size >= limit and last_values is not None:
+        response.headers[CURSOR_HEADER] = encode_cursor(last_values)
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from backend.embedding_index import embedding_index
+from backend.embedding_providers import embedding_provider
+from backend.embedding_store import EMBEDDING_MODEL, decode_embedding, encode_embedding
+from backend.models import UserProfile
+
+AFFINITY_RATE = float(os.getenv("AFFINITY_LEARNING_RATE", "0.2"))  # weight of each swipe in the affinity EMA
+VECTOR_DECAY = float(os.getenv("USER_VECTOR_DECAY", "0.2"))  # weight of each right swipe in the user vector
+MAX_CACHED_PROFILES = int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000"))
+
+# Points a fully learned like (+1) or dislike (-1) adds to the personalized rank;
+# mirrors the onboarding weights in ALGORITHM_EXPLAINED.md
+AFFINITY_WEIGHTS = {"sector": 50, "funding_stage": 30, "city": 20}
+VECTOR_WEIGHT = 30  # points for a startup identical to the user vector
+VECTOR_NEIGHBORS = 50  # startups boosted by the user vector per request
+
+
+class LearnedProfile:
+    """Per-user affinity weights and taste vector, updated in O(1) per swipe"""
+
+    def __init__(self, user_id: str, affinities: Optional[Dict[str, Dict[str, float]]] = None,
+                 vector: Optional[np.ndarray] = None, swipe_count: int = 0):
+        self.user_id = user_id
+        self.affinities = affinities or {dimension: {} for dimension in AFFINITY_WEIGHTS}
+        self.vector = vector
+        self.swipe_count = swipe_count
+
+    def observe(self, startup, direction: str, embedding: Optional[np.ndarray] = None):
+        """Fold one swipe on `startup` (anything with sector/funding_stage/city) into the profile"""
+        outcome = 1.0 if direction == "right" else -1.0
+        # Copy-on-write so concurrent readers of `affinities` always see a consistent dict
+        affinities = dict(self.affinities)
+        for dimension in AFFINITY_WEIGHTS:
+            value = getattr(startup, dimension, None)
+            if not value:
+                continue
+            weights = dict(affinities.get(dimension, {}))
+            current = weights.get(value, 0.0)
+            weights[value] = round(current + AFFINITY_RATE * (outcome - current), 6)
+            affinities[dimension] = weights
+        self.affinities = affinities
+
+        if direction == "right" and embedding is not None:
+            if self.vector is None or self.vector.size != embedding.size:
+                self.vector = embedding.astype(np.float32, copy=True)
+            else:
+                self.vector = ((1.0 - VECTOR_DECAY) * self.vector + VECTOR_DECAY * embedding).astype(np.float32)
+        self.swipe_count += 1
+
+    def points(self, dimension: str) -> Dict[str, float]:
+        """Rank points per value of a dimension, for values with a non-zero affinity"""
+        weight = AFFINITY_WEIGHTS[dimension]
+        return {value: weight * affinity for value, affinity in self.affinities.get(dimension, {}).items() if affinity}
+
+    def neighbor_points(self, limit: int = VECTOR_NEIGHBORS) -> Dict[int, float]:
+        """Rank points for the startups nearest the user vector"""
+        if self.vector is None:
+            return {}
+        return {
+            startup_id: VECTOR_WEIGHT * similarity
+            for startup_id, similarity in embedding_index.search(self.vector, limit=limit)
+            if similarity > 0
+        }
+
+
+class PreferenceLearner:
+    """Keeps recently used profiles in memory and writes updates through to user_profiles"""
+
+    def __init__(self, max_profiles: int = MAX_CACHED_PROFILES):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, LearnedProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, user_id: str) -> LearnedProfile:
+        row = db.get(UserProfile, user_id)
+        if row is None:
+            return LearnedProfile(user_id)
+        vector = None
+        # A vector averaged from another provider's embeddings can't be compared with the catalog's;
+        # rows from before vector_model was recorded are all OpenAI
+        if row.vector is not None and (row.vector_model or EMBEDDING_MODEL) == embedding_provider.name:
+            vector = decode_embedding(row.vector, "float32", row.vector_dim)
+        return LearnedProfile(user_id, json.loads(row.affinities), vector, row.swipe_count)
+
+    def get(self, db: Session, user_id: str) -> LearnedProfile:
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self._profiles.move_to_end(user_id)
+                return profile
+        profile = self._load(db, user_id)
+        with self._lock:
+            # Another request may have loaded it meanwhile; keep the first one
+            profile = self._profiles.setdefault(user_id, profile)
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def observe(self, db: Session, events: Iterable[dict], startups: Dict[int, object]):
+        """Apply swipe events to their users' profiles and persist them in the caller's transaction.
+
+        `startups` maps startup_id to a row with sector, funding_stage and city.
+        """
+        touched: Dict[str, LearnedProfile] = {}
+        for event in events:
+            startup = startups.get(event["startup_id"])
+            if startup is None:
+                continue
+            profile = touched.get(event["user_id"]) or self.get(db, event["user_id"])
+            touched[profile.user_id] = profile
+            embedding = embedding_index.get_vector(event["startup_id"]) if event["direction"] == "right" else None
+            with self._lock:
+                profile.observe(startup, event["direction"], embedding)
+        if touched:
+            self._persist(db, touched.values())
+
+    def _persist(self, db: Session, profiles: Iterable[LearnedProfile]):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for profile in profiles:
+                rows.append({
+                    "user_id": profile.user_id,
+                    "affinities": json.dumps(profile.affinities),
+                    "vector": encode_embedding(profile.vector) if profile.vector is not None else None,
+                    "vector_dim": int(profile.vector.size) if profile.vector is not None else None,
+                    "vector_model": embedding_provider.name if profile.vector is not None else None,
+                    "swipe_count": profile.swipe_count,
+                    "updated_at": now,
+                })
+        statement = insert(UserProfile)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[UserProfile.user_id],
+                set_={column: statement.excluded[column] for column in rows[0] if column != "user_id"},
+            ),
+            rows,
+        )
+
+    def forget(self, user_ids: List[str]):
+        """Drop cached profiles so the next read reloads them from the database"""
+        with self._lock:
+            for user_id in user_ids:
+                self._profiles.pop(user_id, None)
+
+
+preference_learner = PreferenceLearner()
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.database import AsyncReadSessionLocal, AsyncSessionLocal
+from backend.embedding_providers import embedding_provider
+from backend.embedding_store import decode_embedding, encode_embedding
+from backend.models import QueryEmbeddingCacheEntry
+
+MAX_ENTRIES = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+MEMORY_ENTRIES = 2048  # hot queries served without touching the database
+TOUCH_INTERVAL_SECONDS = 60  # coarse LRU: avoid a write on every hit
+EVICTION_CHECK_EVERY = 100  # inserts between eviction sweeps
+
+
+def normalize_query(text: str) -> str:
+    """Lowercased, whitespace-collapsed query, so trivially different spellings share an embedding"""
+    return " ".join(text.lower().split())
+
+
+def query_key(text: str, model: Optional[str] = None) -> str:
+    return hashlib.sha256(f"{model or embedding_provider.name}\n{normalize_query(text)}".encode()).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """Search query embeddings kept in an in-memory LRU in front of a SQLite table.
+
+    Embeddings are deterministic for a model, so entries never expire; the table is
+    bounded by LRU eviction and survives restarts, so a repeated query is embedded once.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, memory_entries: int = MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._inserts = 0
+        self.memory_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def peek(self, key: str) -> Optional[np.ndarray]:
+        """The embedding if it is in memory, without a database lookup"""
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, db: Session, key: str) -> Tuple[Optional[np.ndarray], bool]:
+        """(embedding or None, whether its LRU timestamp is due a `touch`).
+
+        Never writes, so `db` may be a read-only session; the caller runs `touch` on the writer.
+        """
+        vector = self.peek(key)
+        if vector is not None:
+            return vector, False
+        entry = db.get(QueryEmbeddingCacheEntry, key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None, False
+        vector = decode_embedding(entry.embedding, "float32", entry.embedding_dim)
+        with self._lock:
+            self.hits += 1
+        self._remember(key, vector)
+        return vector, time.time() - entry.last_accessed > TOUCH_INTERVAL_SECONDS
+
+    def touch(self, db: Session, key: str):
+        """Mark an entry recently used, for LRU eviction"""
+        db.query(QueryEmbeddingCacheEntry).filter(QueryEmbeddingCacheEntry.key == key).update(
+            {QueryEmbeddingCacheEntry.last_accessed: time.time()}, synchronize_session=False
+        )
+        db.commit()
+
+    def set(self, db: Session, key: str, query: str, vector, model: Optional[str] = None) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        db.merge(QueryEmbeddingCacheEntry(
+            key=key, query=normalize_query(query), embedding=encode_embedding(vector), embedding_dim=vector.size,
+            embedding_model=model or embedding_provider.name, created_at=now, last_accessed=now,
+        ))
+        db.commit()
+        self._remember(key, vector)
+        with self._lock:
+            before = self._inserts
+            self._inserts += 1
+            sweep = before // EVICTION_CHECK_EVERY != self._inserts // EVICTION_CHECK_EVERY
+        if sweep:
+            self.evict(db)
+        return vector
+
+    def evict(self, db: Session) -> int:
+        """Drop the least recently used entries beyond max_entries"""
+        overflow = db.query(func.count(QueryEmbeddingCacheEntry.key)).scalar() - self.max_entries
+        if overflow <= 0:
+            return 0
+        oldest = (
+            db.query(QueryEmbeddingCacheEntry.key)
+            .order_by(QueryEmbeddingCacheEntry.last_accessed)
+            .limit(overflow)
+            .subquery()
+        )
+        removed = (
+            db.query(QueryEmbeddingCacheEntry)
+            .filter(QueryEmbeddingCacheEntry.key.in_(oldest.select()))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self, db: Session) -> dict:
+        with self._lock:
+            memory_hits, hits, misses, evictions = self.memory_hits, self.hits, self.misses, self.evictions
+        total = memory_hits + hits + misses
+        return {
+            "memory_hits": memory_hits,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round((memory_hits + hits) / total, 4) if total else 0.0,
+            "evictions": evictions,
+            "entries": db.query(func.count(QueryEmbeddingCacheEntry.key)).scalar(),
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache()
+
+
+async def get_query_embedding(text: str) -> Optional[np.ndarray]:
+    """Embedding of a search query, from the cache or the embedding API; None if the API call fails.
+
+    Concurrent requests for the same uncached query share one API call. A local provider
+    embeds in-process faster than a cache lookup, so its queries skip the cache.
+    """
+    if embedding_provider.local:
+        return np.asarray(embedding_provider.embed([normalize_query(text)])[0], dtype=np.float32)
+    key = query_key(text)
+    vector = query_embedding_cache.peek(key)
+    if vector is not None:
+        return vector
+    async with AsyncReadSessionLocal() as db:
+        vector, touch = await db.run_sync(query_embedding_cache.get, key)
+    if vector is not None:
+        if touch:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(query_embedding_cache.touch, key)
+        return vector
+
+    try:
+        embedding = (await embedding_provider.embed_async([normalize_query(text)]))[0]
+    except Exception as e:
+        print(f"Error embedding search query: {e}")
+        return None
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(query_embedding_cache.set, key, text, embedding)
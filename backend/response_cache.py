@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ResponseCache:
+    """In-memory LRU of rendered JSON responses with ETag / If-None-Match support.
+
+    ETags are derived from version counters rather than response bodies: the catalog
+    version (bumped by catalog writes) and, for per-user endpoints, the user's version
+    (bumped when their saves or swipes change). A matching If-None-Match is answered
+    with a 304 before any database work.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._boot = uuid.uuid4().hex[:8]  # keeps ETags from a previous process from matching
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._user_versions: Dict[str, int] = {}
+        self._adapters: Dict[Any, TypeAdapter] = {}
+        self.catalog_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def bump_catalog(self):
+        """Invalidate every cached response after startups, summaries or embeddings change"""
+        with self._lock:
+            self.catalog_version += 1
+
+    def bump_user(self, user_id: str):
+        """Invalidate one user's cached responses after their saves or swipes change"""
+        with self._lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+    def versions(self, user_id: str) -> Tuple[int, int]:
+        """(catalog version, user version): changes whenever either kind of bump happens"""
+        with self._lock:
+            return self.catalog_version, self._user_versions.get(user_id, 0)
+
+    def _etag(self, key: tuple, user_id: Optional[str]) -> str:
+        with self._lock:
+            user_version = self._user_versions.get(user_id, 0) if user_id is not None else 0
+            catalog_version = self.catalog_version
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        return f'W/"{self._boot}.{catalog_version}.{user_version}.{digest}"'
+
+    def _adapter(self, model) -> TypeAdapter:
+        adapter = self._adapters.get(model)
+        if adapter is None:
+            adapter = self._adapters[model] = TypeAdapter(model)
+        return adapter
+
+    def respond(self, request: Request, model, build: Callable[[Response], Any], user_id: Optional[str] = None) -> Response:
+        """Serve a GET endpoint through the cache.
+
+        `build(response)` produces the data (ORM objects are fine) and may set headers on
+        `response`; the result is rendered through `model`. Pass `user_id` for responses
+        that depend on the caller's saves or swipes.
+        """
+        key, cache_headers, entry = self._lookup(request, user_id)
+        if isinstance(entry, Response):
+            return entry
+        if entry is None:
+            scratch = Response()
+            entry = self._store(key, cache_headers["ETag"], model, build(scratch), scratch)
+        return self._render(entry, cache_headers)
+
+    async def respond_async(self, request: Request, model, build: Callable[[Response], Awaitable[Any]],
+                            user_id: Optional[str] = None) -> Response:
+        """`respond` for async handlers, where `build(response)` is a coroutine"""
+        key, cache_headers, entry = self._lookup(request, user_id)
+        if isinstance(entry, Response):
+            return entry
+        if entry is None:
+            scratch = Response()
+            entry = self._store(key, cache_headers["ETag"], model, await build(scratch), scratch)
+        return self._render(entry, cache_headers)
+
+    def _lookup(self, request: Request, user_id: Optional[str]) -> tuple:
+        """(key, cache headers, entry), where entry is a 304 response, a fresh cached entry or None"""
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())), user_id)
+        etag = self._etag(key, user_id)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            with self._lock:
+                self.not_modified += 1
+            return key, cache_headers, Response(status_code=304, headers=cache_headers)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, cache_headers, entry
+            self.misses += 1
+        return key, cache_headers, None
+
+    def _store(self, key: tuple, etag: str, model, data, scratch: Response) -> tuple:
+        adapter = self._adapter(model)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        headers = {k: v for k, v in scratch.headers.items() if k.lower() not in ("content-length", "content-type")}
+        entry = (etag, body, headers)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _render(self, entry: tuple, cache_headers: dict) -> Response:
+        _, body, headers = entry
+        return Response(content=body, media_type="application/json", headers={**headers, **cache_headers})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "catalog_version": self.catalog_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+response_cache = ResponseCache()
@@ -1,48 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-import json
 
-from backend.database import get_db
-from backend import crud, schemas
-from backend.openai_utils import analyze_startup, find_similar_startups
+from backend.database import get_async_read_db
+from backend import crud_async, schemas
+from backend.openai_utils import find_similar_startups
+from backend.neighbors import stored_similar_startups
+from backend.analysis_cache import get_startup_analysis
+from backend.users import get_user_id
+from backend.response_cache import response_cache
 
 router = APIRouter(prefix="/api", tags=["ai"])
 
 @router.get("/ai-analysis/{startup_id}", response_model=schemas.AIAnalysis)
-def ai_analysis(startup_id: int, db: Session = Depends(get_db)):
-    """Get AI-powered analysis of a startup"""
-    startup = crud.get_startup_by_id(db, startup_id)
-    if not startup:
-        raise HTTPException(status_code=404, detail="Startup not found")
-    
-    # Check if analysis already exists
-    if startup.ai_summary:
-        return schemas.AIAnalysis(**json.loads(startup.ai_summary))
-    
-    # Generate new analysis
-    analysis = analyze_startup(startup)
-    startup.ai_summary = json.dumps(analysis)
-    db.commit()
+async def ai_analysis(startup_id: int, response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    """Get AI-powered analysis of a startup.
     
+    Responds 202 while another worker is still generating it. The X-Analysis-Status header
+    is "stale" when the profile changed since the analysis was written (a fresh one is
+    being generated) and "fallback" when generation failed.
+    """
+    result = await get_startup_analysis(db, startup_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Startup not found")
+    analysis, status = result
+    if analysis is None:
+        return JSONResponse(status_code=202, content={"status": status}, headers={"Retry-After": "2"})
+    response.headers["X-Analysis-Status"] = status
     return schemas.AIAnalysis(**analysis)
 
 @router.get("/similar/{startup_id}", response_model=List[schemas.SimilarStartup])
-def similar_startups(startup_id: int, db: Session = Depends(get_db)):
-    """Get similar startups based on AI embeddings"""
-    startup = crud.get_startup_by_id(db, startup_id)
-    if not startup:
-        raise HTTPException(status_code=404, detail="Startup not found")
+async def similar_startups(startup_id: int, request: Request, limit: int = 3, same_sector: bool = False,
+                           exclude_swiped: bool = False, user_id: str = Depends(get_user_id),
+                           db: AsyncSession = Depends(get_async_read_db)):
+    """Get similar startups based on AI embeddings.
     
-    similar = find_similar_startups(db, startup, limit=3)
+    Served from the precomputed neighbor lists; startups without one yet are searched live.
+    """
+    async def build(response: Response):
+        exclude = await crud_async.get_swiped_startup_ids(db, user_id) if exclude_swiped else []
+        similar = await db.run_sync(stored_similar_startups, startup_id, limit=limit, same_sector=same_sector,
+                                    exclude_ids=exclude)
+        if similar is None:
+            startup = await crud_async.get_startup_by_id(db, startup_id)
+            if not startup:
+                raise HTTPException(status_code=404, detail="Startup not found")
+            # Exact search is a numpy scan over the catalog: keep it off the event loop
+            similar = await crud_async.run_in_thread(find_similar_startups, startup, limit=limit, same_sector=same_sector,
+                                                     exclude_ids=exclude)
+        
+        return [
+            schemas.SimilarStartup(
+                id=s.id,
+                name=s.name,
+                sector=s.sector,
+                similarity_score=round(score * 100, 1)
+            )
+            for s, score in similar
+        ]
     
-    return [
-        schemas.SimilarStartup(
-            id=s.id,
-            name=s.name,
-            sector=s.sector,
-            similarity_score=round(score * 100, 1)
-        )
-        for s, score in similar
-    ]
-
+    # Only the swipe-filtered variant differs between users
+    return await response_cache.respond_async(request, List[schemas.SimilarStartup], build, user_id if exclude_swiped else None)
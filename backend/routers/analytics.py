@@ -1,24 +1,22 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.database import get_db
-from backend import crud, schemas
+from backend.database import get_async_read_db
+from backend import crud_async, schemas
+from backend.users import get_user_id
+from backend.response_cache import response_cache
 
 router = APIRouter(prefix="/api", tags=["analytics"])
 
 @router.get("/analytics", response_model=schemas.AnalyticsResponse)
-def get_analytics(db: Session = Depends(get_db)):
+async def get_analytics(request: Request, user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
     """Get analytics data for saved startups"""
-    sector_dist = crud.get_sector_distribution(db)
-    avg_growth = crud.get_avg_growth_by_sector(db)
-    funding_counts = crud.get_funding_stage_counts(db)
-    saved = crud.get_saved_startups(db)
+    async def build(response: Response):
+        return schemas.AnalyticsResponse(**await crud_async.get_analytics_summary(db, user_id))
     
-    return schemas.AnalyticsResponse(
-        sector_distribution=sector_dist,
-        avg_growth_by_sector=avg_growth,
-        funding_stage_counts=funding_counts,
-        total_saved=len(saved),
-        total_viewed=db.query(crud.Startup).count()
-    )
+    return await response_cache.respond_async(request, schemas.AnalyticsResponse, build, user_id)
 
+@router.get("/response-cache/stats")
+def get_response_cache_stats():
+    """Response cache counters"""
+    return response_cache.stats()
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
-from backend.database import get_db
-from backend.openai_utils import get_personalized_recommendations
+from backend.database import get_async_db, get_async_read_db
+from backend import crud_async, schemas
+from backend.models import Startup
+from backend.match_cache import get_cached_match_score, match_score_cache, stream_match_scores
+from backend.scoring import scoring_engine
+from backend.pagination import decode_cursor, set_next_cursor
+from backend.users import get_user_id
+from backend.deck_cache import deck_cache
 
 router = APIRouter(prefix="/api", tags=["preferences"])
 
@@ -18,55 +28,101 @@ class UserPreferences(BaseModel):
     experience_level: str
     preferred_locations: List[str]
 
+class BatchMatchScoreRequest(BaseModel):
+    preferences: UserPreferences
+    startup_ids: Optional[List[int]] = None  # None means the /personalized-startups candidates
+
 @router.post("/save-preferences")
-def save_user_preferences(preferences: UserPreferences):
-    """Save user preferences (can be enhanced to store in DB later)"""
+async def save_user_preferences(preferences: UserPreferences, user_id: str = Depends(get_user_id),
+                                db: AsyncSession = Depends(get_async_db)):
+    """Save the user's onboarding preferences"""
+    await crud_async.save_user_preferences(db, user_id, preferences.model_dump())
+    deck_cache.refresh(user_id, preferences.model_dump())
     return {
         "success": True,
         "message": "Preferences saved successfully"
     }
 
-@router.post("/personalized-startups")
-def get_personalized_startups(preferences: UserPreferences, db: Session = Depends(get_db)):
-    """Get personalized startup recommendations based on user preferences"""
-    from backend.crud import get_startups
-    
-    # Get all startups
-    startups = get_startups(db, limit=100)
-    
-    # Filter by sector if specified
-    if preferences.selected_sectors:
-        startups = [s for s in startups if s.sector in preferences.selected_sectors]
-    
-    # Filter by funding stage if specified
-    if preferences.investment_stage:
-        startups = [s for s in startups if s.funding_stage in preferences.investment_stage]
+@router.get("/preferences", response_model=UserPreferences)
+async def get_user_preferences(user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
+    """The user's saved onboarding preferences"""
+    preferences = await crud_async.get_user_preferences(db, user_id)
+    if preferences is None:
+        raise HTTPException(status_code=404, detail="No preferences saved")
+    return preferences
+
+@router.post("/personalized-startups", response_model=List[schemas.StartupCard])
+async def get_personalized_startups(preferences: UserPreferences, response: Response, limit: int = 20, offset: int = 0,
+                                    cursor: Optional[str] = None, user_id: str = Depends(get_user_id),
+                                    db: AsyncSession = Depends(get_async_read_db)):
+    """Get personalized startup recommendations based on user preferences.
     
-    # Filter by location if specified (basic matching)
-    if preferences.preferred_locations:
-        location_filter = []
-        for startup in startups:
-            for pref_loc in preferences.preferred_locations:
-                if pref_loc.split(',')[0] in startup.location:
-                    location_filter.append(startup)
-                    break
-        if location_filter:
-            startups = location_filter
+    Pages are keyset-paginated: pass the X-Next-Cursor header back as `cursor`.
+    """
+    after = decode_cursor(cursor, 3)
+    ranked = await rank_personalized_startups(db, user_id, preferences, limit=limit, offset=offset, after=tuple(after) if after else None)
+    if ranked:
+        last, last_rank = ranked[-1]
+        set_next_cursor(response, len(ranked), limit, [last_rank, last.growth_rate, last.id])
+    return [startup for startup, _ in ranked]
+
+@router.get("/deck", response_model=List[schemas.StartupCard])
+async def get_deck(limit: int = 10, user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
+    """Next cards from the user's precomputed deck, ranked by their saved preferences.
     
-    # Return top matches (can be enhanced with AI scoring later)
-    return startups[:20]
+    Each call returns new cards; the deck refills itself in the background.
+    """
+    preferences = await crud_async.get_user_preferences(db, user_id)
+    if preferences is None:
+        raise HTTPException(status_code=404, detail="No preferences saved")
+    return await crud_async.run_in_thread(deck_cache.take, user_id, preferences, limit=limit)
+
+@router.get("/deck/stats")
+async def get_deck_stats():
+    """Deck cache counters"""
+    return deck_cache.stats()
+
+async def rank_personalized_startups(db: AsyncSession, user_id: str, preferences: UserPreferences, limit: int = 20,
+                                     offset: int = 0, after=None):
+    """Ranked (startup, rank) page matching the user's preferences, adjusted by what they have swiped"""
+    return await crud_async.get_ranked_startups_for_user(db, user_id, preferences.model_dump(), limit=limit, offset=offset, after=after)
+
+async def select_personalized_startups(db: AsyncSession, user_id: str, preferences: UserPreferences, limit: int = 20) -> List[Startup]:
+    """First page of personalized startups, best match first"""
+    return [startup for startup, _ in await rank_personalized_startups(db, user_id, preferences, limit=limit)]
+
+def local_match_scores(db: Session, startup_ids: List[int], preferences: dict) -> List[dict]:
+    """Scores from the local weighted model, in request order, skipping unknown startups"""
+    scoring_engine.ensure_loaded(db)
+    return [
+        {
+            "startup_id": startup_id,
+            "match_score": score,
+            "reasoning": "This startup " + ", ".join(reasons) if reasons else "Few of your preferences match this startup"
+        }
+        for startup_id, (score, reasons) in scoring_engine.match_scores(startup_ids, preferences).items()
+    ]
 
 @router.post("/ai-match-score")
-async def get_ai_match_score(startup_id: int, preferences: UserPreferences, db: Session = Depends(get_db)):
-    """Get AI-calculated match score for a startup based on user preferences"""
-    from backend.crud import get_startup_by_id
+async def get_ai_match_score(startup_id: int, preferences: UserPreferences, use_llm: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Get a match score for a startup based on user preferences.
+    
+    Scores come from the local weighted model; pass use_llm=true to ask the LLM instead.
+    """
+    if not use_llm:
+        await db.close()
+        results = await crud_async.run_in_thread(local_match_scores, [startup_id], preferences.model_dump())
+        if not results:
+            return {"error": "Startup not found"}
+        return results[0]
     
-    startup = get_startup_by_id(db, startup_id)
+    startup = await crud_async.get_startup_by_id(db, startup_id)
     if not startup:
         return {"error": "Startup not found"}
     
-    # Generate match score using OpenAI
-    score = await get_personalized_recommendations(startup, preferences)
+    # Cached by startup profile + preferences; only misses call OpenAI
+    score = await get_cached_match_score(db, startup, preferences.model_dump())
     
     return {
         "startup_id": startup_id,
@@ -74,3 +130,34 @@ async def get_ai_match_score(startup_id: int, preferences: UserPreferences, db:
         "reasoning": "Based on your preferences and the startup's profile"
     }
 
+
+@router.post("/ai-match-scores")
+async def get_ai_match_scores(request: BatchMatchScoreRequest, use_llm: bool = False, user_id: str = Depends(get_user_id),
+                              db: AsyncSession = Depends(get_async_read_db)):
+    """Score a whole deck in one call as NDJSON lines.
+    
+    Scores come from the local weighted model; pass use_llm=true to stream LLM scores as they arrive.
+    """
+    if request.startup_ids is None:
+        startups = await select_personalized_startups(db, user_id, request.preferences)
+    else:
+        startups = await crud_async.get_startups_by_ids(db, request.startup_ids)
+    # Loaded attributes stay readable after close; the stream opens its own sessions
+    await db.close()
+    
+    if not use_llm:
+        results = await crud_async.run_in_thread(
+            local_match_scores, [startup.id for startup in startups], request.preferences.model_dump()
+        )
+        return Response("".join(json.dumps(result) + "\n" for result in results), media_type="application/x-ndjson")
+    
+    async def lines():
+        async for result in stream_match_scores(startups, request.preferences.model_dump()):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/ai-match-score/cache-stats")
+async def get_match_score_cache_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """Hit/miss counters and size of the match score cache"""
+    return await db.run_sync(match_score_cache.stats)
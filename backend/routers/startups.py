@@ -1,44 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+import time
 
-from backend.database import get_db
-from backend import crud, schemas
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+
+from backend.database import get_async_db, get_async_read_db
+from backend import crud_async, schemas
+from backend.pagination import decode_cursor, set_next_cursor
+from backend.users import get_user_id
+from backend.swipe_buffer import swipe_buffer
+from backend.response_cache import response_cache
+from backend.hybrid_search import hybrid_search
+from backend.query_embeddings import get_query_embedding, query_embedding_cache
 
 router = APIRouter(prefix="/api", tags=["startups"])
 
 @router.get("/startups", response_model=List[schemas.StartupCard])
-def list_startups(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)):
-    """Get a list of startups for swiping"""
-    startups = crud.get_startups(db, limit=limit, offset=offset)
-    return startups
+async def list_startups(request: Request, limit: int = 10, offset: int = 0, cursor: Optional[str] = None,
+                        user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
+    """Get a list of startups for swiping.
+    
+    Pass the X-Next-Cursor header from the previous page as `cursor`; `offset` is kept for old clients.
+    """
+    after = decode_cursor(cursor, 1)
+    
+    async def build(response: Response):
+        startups = await crud_async.get_startups(db, user_id, limit=limit, offset=offset, after_id=after[0] if after else None)
+        set_next_cursor(response, len(startups), limit, [startups[-1].id] if startups else None)
+        return startups
+    
+    return await response_cache.respond_async(request, List[schemas.StartupCard], build, user_id)
+
+@router.get("/search", response_model=List[schemas.StartupCard])
+async def search_startups(request: Request, response: Response, q: str, limit: int = 20, cursor: Optional[str] = None,
+                          prefix: bool = True, mode: Literal["text", "hybrid"] = "text",
+                          stage: Optional[List[str]] = Query(None), min_valuation: Optional[float] = None,
+                          max_valuation: Optional[float] = None, min_growth: Optional[float] = None,
+                          max_growth: Optional[float] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """Full-text search over name, description, sector and location, most relevant first.
+    
+    Every word must match and the last one also matches as a prefix (`prefix=false` turns
+    that off), so it doubles as typeahead. Valuation (millions), growth and stage narrow the results.
+    `mode=hybrid` also matches by meaning: keyword and embedding results are fused, so
+    a query finds startups described in other words.
+    """
+    after = decode_cursor(cursor, 2)
+    filters = {"stages": stage, "min_valuation": min_valuation, "max_valuation": max_valuation,
+               "min_growth": min_growth, "max_growth": max_growth}
+    vector = await get_query_embedding(q) if mode == "hybrid" else None
+    
+    async def build(response: Response):
+        if mode == "hybrid":
+            results = await crud_async.run_in_thread(hybrid_search, q, vector, limit=limit,
+                                                     after=tuple(after) if after else None, **filters)
+        else:
+            results = await crud_async.search_startups(db, q, prefix=prefix, limit=limit,
+                                                       after=tuple(after) if after else None, **filters)
+        if results:
+            last, last_score = results[-1]
+            set_next_cursor(response, len(results), limit, [last_score, last.id])
+        return [startup for startup, _ in results]
+    
+    if mode == "hybrid" and vector is None:
+        # The query couldn't be embedded: keyword results only, uncached so the next request retries
+        response.headers["X-Search-Mode"] = "text"
+        return await build(response)
+    return await response_cache.respond_async(request, List[schemas.StartupCard], build)
+
+@router.get("/search/cache-stats")
+async def get_query_embedding_cache_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """Hit/miss counters of the query embedding cache used by hybrid search"""
+    return await db.run_sync(query_embedding_cache.stats)
 
 @router.get("/startup/{startup_id}", response_model=schemas.StartupDetail)
-def get_startup(startup_id: int, db: Session = Depends(get_db)):
+async def get_startup(startup_id: int, request: Request, user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
     """Get detailed information about a specific startup"""
-    startup = crud.get_startup_by_id(db, startup_id)
-    if not startup:
-        raise HTTPException(status_code=404, detail="Startup not found")
-    return startup
+    async def build(response: Response):
+        startup = await crud_async.get_startup_by_id(db, startup_id)
+        if not startup:
+            raise HTTPException(status_code=404, detail="Startup not found")
+        detail = schemas.StartupDetail.model_validate(startup)
+        detail.is_saved = await crud_async.is_startup_saved(db, user_id, startup_id)
+        return detail
+    
+    return await response_cache.respond_async(request, schemas.StartupDetail, build, user_id)
 
 @router.post("/save/{startup_id}", response_model=schemas.SaveResponse)
-def save_startup(startup_id: int, db: Session = Depends(get_db)):
+async def save_startup(startup_id: int, user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_db)):
     """Save a startup to favorites"""
-    startup = crud.save_startup(db, startup_id)
+    startup = await crud_async.save_startup(db, user_id, startup_id)
     if not startup:
         raise HTTPException(status_code=404, detail="Startup not found")
     return schemas.SaveResponse(success=True, message=f"Saved {startup.name}")
 
 @router.delete("/save/{startup_id}", response_model=schemas.SaveResponse)
-def remove_saved_startup(startup_id: int, db: Session = Depends(get_db)):
+async def remove_saved_startup(startup_id: int, user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_db)):
     """Remove a startup from saved"""
-    success = crud.unsave_startup(db, startup_id)
+    success = await crud_async.unsave_startup(db, user_id, startup_id)
     if not success:
         raise HTTPException(status_code=404, detail="Startup not found")
     return schemas.SaveResponse(success=True, message="Startup removed from saved")
 
 @router.get("/saved", response_model=List[schemas.StartupCard])
-def list_saved(db: Session = Depends(get_db)):
-    """Get all saved startups"""
-    return crud.get_saved_startups(db)
+async def list_saved(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
+    """Get saved startups (all of them unless `limit` is given, then paged by `cursor`)"""
+    after = decode_cursor(cursor, 1)
+    
+    async def build(response: Response):
+        startups = await crud_async.get_saved_startups(db, user_id, limit=limit, after_id=after[0] if after else None)
+        set_next_cursor(response, len(startups), limit, [startups[-1].id] if startups else None)
+        return startups
+    
+    return await response_cache.respond_async(request, List[schemas.StartupCard], build, user_id)
+
+
+@router.post("/swipe", response_model=schemas.SaveResponse)
+async def swipe_startup(swipe: schemas.SwipeRequest, user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_db)):
+    """Record a swipe; a right swipe also saves the startup"""
+    startup = await crud_async.record_swipe(db, user_id, swipe.startup_id, swipe.direction)
+    if not startup:
+        raise HTTPException(status_code=404, detail="Startup not found")
+    return schemas.SaveResponse(success=True, message=f"Swiped {swipe.direction} on {startup.name}")
+
+@router.post("/swipes", response_model=schemas.SwipeBatchResponse, status_code=202)
+async def ingest_swipes(batch: schemas.SwipeBatchRequest, user_id: str = Depends(get_user_id)):
+    """Queue a batch of swipes for bulk writing; responds 503 when the buffer is full"""
+    now = time.time()
+    events = [
+        {"user_id": user_id, "startup_id": event.startup_id, "direction": event.direction, "created_at": event.created_at or now}
+        for event in batch.events
+    ]
+    if not swipe_buffer.add(events):
+        raise HTTPException(status_code=503, detail="Swipe buffer is full, retry shortly",
+                            headers={"Retry-After": str(max(1, round(swipe_buffer.interval)))})
+    return schemas.SwipeBatchResponse(accepted=len(events))
+
+@router.get("/swipes/stats")
+async def get_swipe_buffer_stats():
+    """Counters for the swipe ingestion buffer"""
+    return swipe_buffer.stats()
 
+@router.get("/swipes", response_model=List[schemas.SwipeEventResponse])
+async def list_swipes(response: Response, limit: int = 50, cursor: Optional[str] = None,
+                      user_id: str = Depends(get_user_id), db: AsyncSession = Depends(get_async_read_db)):
+    """The user's swipe history, newest first"""
+    before = decode_cursor(cursor, 2)
+    events = await crud_async.get_swipe_history(db, user_id, limit=limit, before=tuple(before) if before else None)
+    set_next_cursor(response, len(events), limit, [events[-1].created_at, events[-1].id] if events else None)
+    return events
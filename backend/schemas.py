@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Literal
 
 class StartupBase(BaseModel):
     name: str
@@ -30,6 +30,28 @@ class SaveResponse(BaseModel):
     success: bool
     message: str
 
+class SwipeRequest(BaseModel):
+    startup_id: int
+    direction: Literal["left", "right"]
+
+class SwipeEventIn(SwipeRequest):
+    created_at: Optional[float] = None  # unix timestamp of the swipe on the device; defaults to receipt time
+
+class SwipeBatchRequest(BaseModel):
+    events: List[SwipeEventIn] = Field(..., min_length=1, max_length=1000)
+
+class SwipeBatchResponse(BaseModel):
+    accepted: int
+
+class SwipeEventResponse(BaseModel):
+    id: int
+    startup_id: int
+    direction: str
+    created_at: float
+    
+    class Config:
+        from_attributes = True
+
 class AnalyticsResponse(BaseModel):
     sector_distribution: Dict[str, int]
     avg_growth_by_sector: Dict[str, float]
@@ -0,0 +1,234 @@
+import threading
+import time
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.embedding_index import embedding_index
+from backend.models import SectorGram, SectorSimilarity, Startup, split_location
+
+# Weights from ALGORITHM_EXPLAINED.md, plus semantic similarity to the user's sectors
+SECTOR_WEIGHT = 50
+STAGE_WEIGHT = 30
+LOCATION_WEIGHT = 20
+RISK_WEIGHT = 20
+SIMILARITY_WEIGHT = 30
+MAX_SCORE = SECTOR_WEIGHT + STAGE_WEIGHT + LOCATION_WEIGHT + RISK_WEIGHT + SIMILARITY_WEIGHT
+
+# Growth-rate bands (exclusive bounds, in %) that suit each risk tolerance
+RISK_BANDS = {
+    "aggressive": (300.0, np.inf),
+    "moderate": (200.0, 350.0),
+    "conservative": (-np.inf, 250.0),
+}
+
+
+class _Catalog:
+    """Column arrays for every startup, with categorical fields dictionary-encoded"""
+
+    def __init__(self, rows):
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.growth = np.array([row.growth_rate for row in rows], dtype=np.float32)
+        self.sectors, self.sector_codes = self._encode([row.sector for row in rows])
+        self.stages, self.stage_codes = self._encode([row.funding_stage for row in rows])
+        self.locations, self.location_codes = self._encode([row.location for row in rows])
+        self.cities, self.city_codes = self._encode([row.city or "" for row in rows])  # normalized, as in SQL
+        self.row_of = {int(startup_id): i for i, startup_id in enumerate(self.ids)}
+        self.sector_lookup = {sector: i for i, sector in enumerate(self.sectors)}
+        self.stage_lookup = {stage: i for i, stage in enumerate(self.stages)}
+        self.city_lookup = {city: i for i, city in enumerate(self.cities) if city}
+
+        # Embedding-derived data, rebuilt whenever the embedding index changes
+        self.index_version = -1
+        self.embedded = np.zeros(len(self.ids), dtype=bool)
+        self.sector_dots = np.zeros((len(self.sectors), len(self.ids)), dtype=np.float32)
+        self.sector_gram = np.zeros((len(self.sectors), len(self.sectors)), dtype=np.float32)
+
+    @staticmethod
+    def _encode(values: List[str]) -> Tuple[List[str], np.ndarray]:
+        if not values:
+            return [], np.zeros(0, dtype=np.int32)
+        vocab, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+        return list(vocab), codes.astype(np.int32)
+
+    def refresh_embeddings(self):
+        """Precompute each startup's dot product with every sector's mean embedding.
+
+        A user's interest vector is the mean of their sectors' centroids, so its
+        similarity to every startup is a weighted sum of these rows; scoring then
+        costs O(N * selected sectors) instead of a full matrix-vector product.
+        """
+        matrix, index_ids, version = embedding_index.snapshot()
+        if version == self.index_version:
+            return
+        position_of = {int(startup_id): i for i, startup_id in enumerate(index_ids)}
+        positions = np.array([position_of.get(int(startup_id), -1) for startup_id in self.ids], dtype=np.int64)
+        embedded = positions >= 0
+        n_sectors = len(self.sectors)
+
+        if embedded.any():
+            vectors = matrix[positions[embedded]]
+            sectors = self.sector_codes[embedded]
+            centroids = np.zeros((n_sectors, vectors.shape[1]), dtype=np.float32)
+            np.add.at(centroids, sectors, vectors)
+            counts = np.bincount(sectors, minlength=n_sectors).astype(np.float32)
+            centroids /= np.maximum(counts, 1.0)[:, None]
+            dots = np.zeros((n_sectors, len(self.ids)), dtype=np.float32)
+            dots[:, embedded] = centroids @ vectors.T
+            self.sector_dots, self.sector_gram = dots, centroids @ centroids.T
+        else:
+            self.sector_dots = np.zeros((n_sectors, len(self.ids)), dtype=np.float32)
+            self.sector_gram = np.zeros((n_sectors, n_sectors), dtype=np.float32)
+        self.embedded = embedded
+        self.index_version = version
+
+
+class ScoringEngine:
+    """Deterministic, vectorized match scoring over the whole catalog"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog: Optional[_Catalog] = None
+        self._stale = True
+
+    def load(self, db: Session):
+        """(Re)build the column arrays from the startups table"""
+        rows = (
+            db.query(Startup.id, Startup.sector, Startup.funding_stage, Startup.location, Startup.city, Startup.growth_rate)
+            .order_by(Startup.id)
+            .all()
+        )
+        catalog = _Catalog(rows)
+        catalog.refresh_embeddings()
+        with self._lock:
+            self._catalog = catalog
+            self._stale = False
+
+    def invalidate(self):
+        """Mark the catalog arrays stale after startups are added or edited"""
+        self._stale = True
+
+    def ensure_loaded(self, db: Session):
+        if self._stale or self._catalog is None:
+            self.load(db)
+
+    def _current(self) -> _Catalog:
+        catalog = self._catalog
+        if catalog is None:
+            raise RuntimeError("Scoring engine has not been loaded")
+        with self._lock:
+            catalog.refresh_embeddings()
+        return catalog
+
+    @staticmethod
+    def _components(catalog: _Catalog, preferences: dict) -> Dict[str, np.ndarray]:
+        """Per-factor scores in [0, 1] for every startup"""
+        sector_ids = [catalog.sector_lookup[s] for s in preferences.get("selected_sectors", []) if s in catalog.sector_lookup]
+        stage_ids = [catalog.stage_lookup[s] for s in preferences.get("investment_stage", []) if s in catalog.stage_lookup]
+
+        cities = [city for city, _ in map(split_location, preferences.get("preferred_locations", [])) if city]
+        city_ids = [catalog.city_lookup[city] for city in cities if city in catalog.city_lookup]
+
+        band = RISK_BANDS.get(str(preferences.get("risk_tolerance", "")).lower())
+        if band:
+            risk = (catalog.growth > band[0]) & (catalog.growth < band[1])
+        else:
+            risk = np.zeros(len(catalog.ids), dtype=bool)
+
+        return {
+            "sector": np.isin(catalog.sector_codes, sector_ids),
+            "stage": np.isin(catalog.stage_codes, stage_ids),
+            "location": np.isin(catalog.city_codes, city_ids),
+            "risk": risk,
+            "similarity": ScoringEngine._similarity(catalog, sector_ids),
+        }
+
+    @staticmethod
+    def _similarity(catalog: _Catalog, sector_ids: List[int]) -> np.ndarray:
+        """Cosine similarity in [0, 1] of every startup to the mean of the selected sectors' centroids"""
+        similarity = np.zeros(len(catalog.ids), dtype=np.float32)
+        if sector_ids:
+            weights = np.zeros(len(catalog.sectors), dtype=np.float32)
+            weights[sector_ids] = 1.0 / len(sector_ids)
+            norm = float(np.sqrt(max(weights @ catalog.sector_gram @ weights, 0.0)))
+            if norm > 0:
+                similarity = np.clip(weights[sector_ids] @ catalog.sector_dots[sector_ids] / norm, 0.0, 1.0)
+        return similarity
+
+    @staticmethod
+    def _total(components: Dict[str, np.ndarray]) -> np.ndarray:
+        return (
+            SECTOR_WEIGHT * components["sector"]
+            + STAGE_WEIGHT * components["stage"]
+            + LOCATION_WEIGHT * components["location"]
+            + RISK_WEIGHT * components["risk"]
+            + SIMILARITY_WEIGHT * components["similarity"]
+        ).astype(np.float32)
+
+    def match_scores(self, startup_ids: List[int], preferences: dict) -> Dict[int, Tuple[int, List[str]]]:
+        """0-100 match score plus the contributing factors for each known startup, from one catalog pass"""
+        catalog = self._current()
+        components = self._components(catalog, preferences)
+        totals = self._total(components)
+
+        results = {}
+        for startup_id in startup_ids:
+            row = catalog.row_of.get(startup_id)
+            if row is None:
+                continue
+            reasons = []
+            if components["sector"][row]:
+                reasons.append(f"matches your sector interest in {catalog.sectors[catalog.sector_codes[row]]}")
+            if components["stage"][row]:
+                reasons.append(f"is at your preferred {catalog.stages[catalog.stage_codes[row]]} stage")
+            if components["location"][row]:
+                reasons.append(f"is based in {catalog.locations[catalog.location_codes[row]]}")
+            if components["risk"][row]:
+                reasons.append(f"has growth that fits your {preferences.get('risk_tolerance', '').lower()} risk tolerance")
+            if components["similarity"][row] > 0:
+                reasons.append(f"is {round(float(components['similarity'][row]) * 100)}% similar to the sectors you follow")
+            results[startup_id] = (round(100 * float(totals[row]) / MAX_SCORE), reasons)
+        return results
+
+    def match_score(self, startup_id: int, preferences: dict) -> Optional[Tuple[int, List[str]]]:
+        """0-100 match score for one startup plus the factors that contributed"""
+        return self.match_scores([startup_id], preferences).get(startup_id)
+
+
+scoring_engine = ScoringEngine()
+
+_INSERT_SIMILARITY = f"INSERT INTO {SectorSimilarity.__tablename__} (startup_id, sector, similarity) VALUES (?, ?, ?)"
+_INSERT_GRAM = f"INSERT INTO {SectorGram.__tablename__} (sector, other_sector, dot) VALUES (?, ?, ?)"
+
+
+def sector_similarities_stored(db: Session) -> bool:
+    return db.query(SectorGram.sector).first() is not None
+
+
+def store_sector_similarities(db: Session) -> dict:
+    """Replace the stored sector similarities and sector gram with freshly computed ones.
+
+    Run after embeddings change: until then, startups embedded since the last run get
+    no similarity term in the SQL rank. Everything is swapped in a single transaction.
+    """
+    started = time.perf_counter()
+    scoring_engine.load(db)
+    catalog = scoring_engine._current()
+    ids = catalog.ids[catalog.embedded].tolist()
+    db.query(SectorSimilarity).delete()
+    db.query(SectorGram).delete()
+    connection = db.connection()
+    if ids:
+        # One sector at a time, so only one column of rows is materialized as tuples
+        for code, sector in enumerate(catalog.sectors):
+            dots = catalog.sector_dots[code, catalog.embedded].tolist()
+            connection.exec_driver_sql(_INSERT_SIMILARITY, list(zip(ids, repeat(sector), dots)))
+        connection.exec_driver_sql(_INSERT_GRAM, [
+            (sector, other, float(catalog.sector_gram[i, j]))
+            for i, sector in enumerate(catalog.sectors)
+            for j, other in enumerate(catalog.sectors)
+        ])
+    db.commit()
+    return {"startups": len(ids), "sectors": len(catalog.sectors), "seconds": round(time.perf_counter() - started, 3)}
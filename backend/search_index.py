@@ -0,0 +1,147 @@
+import os
+import re
+from typing import List, Optional
+
+from sqlalchemy import column, func, literal_column, select, table
+
+FTS_TABLE = "startups_fts"
+FTS_COLUMNS = ("name", "description", "sector", "location")
+# bm25 weight per FTS column: a name hit outranks sector and location, which outrank description
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+# Prefix lengths FTS5 indexes directly, so short typeahead prefixes don't scan the term list
+PREFIX_INDEXES = "2 3"
+MIN_PREFIX_LENGTH = 2  # a shorter last word only matches whole words
+# BM25 costs ~1us per matching row, so typeahead ranks the name matches plus at most this many others
+TYPEAHEAD_CANDIDATES = int(os.getenv("SEARCH_TYPEAHEAD_CANDIDATES", "1000"))
+# Matching rows an any-word query may rank; the most common words are dropped to stay under it
+ANY_WORD_BUDGET = int(os.getenv("SEARCH_ANY_WORD_BUDGET", "20000"))
+
+# External-content FTS5 table over startups: the index stores tokens only and reads the
+# text back from startups, so the catalog isn't stored twice
+CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(FTS_COLUMNS)}, content='startups', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='{PREFIX_INDEXES}')"
+)
+
+_new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+_columns = ", ".join(FTS_COLUMNS)
+
+# Keep the index in sync with every write to startups, whichever code path makes it.
+# Updates only reindex when a searched column changes, not on swipes or AI summaries.
+TRIGGERS = {
+    "startups_fts_insert": f"""AFTER INSERT ON startups BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+    "startups_fts_delete": f"""AFTER DELETE ON startups BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old});
+    END""",
+    "startups_fts_update": f"""AFTER UPDATE OF {_columns} ON startups BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+}
+
+# Per-term document counts, for pruning common words from any-word queries
+VOCAB_TABLE = f"{FTS_TABLE}_vocab"
+CREATE_VOCAB_TABLE = f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')"
+
+fts = table(FTS_TABLE, column("rowid"))
+vocab = table(VOCAB_TABLE, column("term"), column("doc"))
+
+# Dropped from any-word queries, where they would match most of the catalog and add nothing
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or that the to with who what which".split()
+)
+
+
+def ensure_search_index(engine) -> bool:
+    """Create the FTS5 index and its sync triggers; True if the index was (re)built from startups.
+
+    The index is rebuilt when it is new or when any trigger was missing, since
+    writes made without the triggers never reached it.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        existing = {name for name, in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE name = ? OR type = 'trigger'", (FTS_TABLE,)
+        )}
+        conn.exec_driver_sql(CREATE_TABLE)
+        conn.exec_driver_sql(CREATE_VOCAB_TABLE)
+        for name, body in TRIGGERS.items():
+            conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        stale = not existing >= {FTS_TABLE, *TRIGGERS}
+        if stale:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return stale
+
+
+def drop_sync_triggers(engine):
+    """Stop indexing row by row ahead of a bulk load; ensure_search_index restores and rebuilds.
+
+    Per-row trigger indexing is several times slower than one rebuild at the end.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        for name in TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def query_words(query: str, match_all: bool = True) -> List[str]:
+    """Lowercased words of free-text user input; any-word queries also drop stopwords"""
+    words = re.findall(r"\w+", query.lower())
+    if not match_all:
+        words = [word for word in words if word not in STOPWORDS] or words
+    return words
+
+
+def drop_common_words(db, words: List[str], budget: int = ANY_WORD_BUDGET) -> List[str]:
+    """The rarest words whose matching rows fit in `budget`, always at least one.
+
+    A word in a large share of the catalog adds almost nothing to BM25 but makes an
+    any-word query rank most of the table.
+    """
+    if len(words) < 2:
+        return words
+    counts = dict(db.execute(select(vocab.c.term, vocab.c.doc).where(vocab.c.term.in_(words))).all())
+    kept, total = [], 0
+    for word in sorted(dict.fromkeys(words), key=lambda word: counts.get(word, 0)):
+        total += counts.get(word, 0)
+        if kept and total > budget:
+            break
+        kept.append(word)
+    return [word for word in words if word in kept]
+
+
+def match_expression(words: List[str], prefix: bool = True, match_all: bool = True) -> Optional[str]:
+    """FTS5 MATCH expression for query words, or None if there are none.
+
+    Every word must match (implicit AND), or with `match_all=False` any of them (BM25
+    still ranks rows matching more of them first). Words are quoted so FTS5 operators
+    and punctuation are treated as text; with `prefix` the last word also matches
+    longer words, for typeahead.
+    """
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if prefix and len(words[-1]) >= MIN_PREFIX_LENGTH:
+        terms[-1] += "*"
+    return (" " if match_all else " OR ").join(terms)
+
+
+def in_column(column_name: str, expression: str) -> str:
+    """`expression` restricted to matches within one FTS column"""
+    return f"{{{column_name}}} : ({expression})"
+
+
+def matches(expression: str):
+    """SQL condition: the FTS row matches `expression`"""
+    return literal_column(FTS_TABLE).op("MATCH")(expression)
+
+
+def bm25():
+    """BM25 relevance of the current FTS row; lower is better"""
+    return func.bm25(literal_column(FTS_TABLE), *(literal_column(repr(w)) for w in BM25_WEIGHTS))
@@ -0,0 +1,121 @@
+"""Minimal OpenAI-compatible stub server for exercising batch jobs offline.
+
+Run with `python -m uvicorn backend.stub_openai:app --port 8001` and point jobs
+at it with `--base-url http://localhost:8001/v1` (or OPENAI_BASE_URL).
+"""
+import hashlib
+import os
+import random
+import time
+import json
+import re
+from typing import List, Optional, Union
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+EMBEDDING_DIM = int(os.getenv("STUB_EMBEDDING_DIM", "1536"))
+FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+RATE_LIMIT_RATE = float(os.getenv("STUB_RATE_LIMIT_RATE", "0"))  # share of requests answered 429
+RETRY_AFTER_SECONDS = os.getenv("STUB_RETRY_AFTER_SECONDS", "1")
+
+app = FastAPI(title="OpenAI stub")
+stats = {"embedding_requests": 0, "embedding_inputs": 0, "chat_requests": 0, "rate_limited": 0}
+
+
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str]]
+    model: str
+
+
+class ChatRequest(BaseModel):
+    model: str
+    messages: List[dict]
+    response_format: Optional[dict] = None
+
+
+def fake_embedding(text: str) -> List[float]:
+    """Deterministic unit vector derived from the text"""
+    seed = int(hashlib.sha256(text.encode()).hexdigest()[:16], 16)
+    vector = np.random.default_rng(seed).normal(size=EMBEDDING_DIM)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def simulate_upstream():
+    """Apply configured latency and return an error response for injected failures"""
+    if LATENCY_MS:
+        time.sleep(LATENCY_MS / 1000)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        return JSONResponse(status_code=503, content={"error": {"message": "stub: injected failure", "type": "server_error"}})
+    if RATE_LIMIT_RATE and random.random() < RATE_LIMIT_RATE:
+        stats["rate_limited"] += 1
+        return JSONResponse(status_code=429, headers={"retry-after": RETRY_AFTER_SECONDS},
+                            content={"error": {"message": "stub: rate limited", "type": "rate_limit_exceeded"}})
+    return None
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (~4 characters each), so usage and cost metrics have something to add up"""
+    return max(1, len(text) // 4)
+
+
+@app.post("/v1/embeddings")
+def create_embeddings(request: EmbeddingRequest):
+    error = simulate_upstream()
+    if error:
+        return error
+    inputs = [request.input] if isinstance(request.input, str) else request.input
+    stats["embedding_requests"] += 1
+    stats["embedding_inputs"] += len(inputs)
+    return {
+        "object": "list",
+        "model": request.model,
+        "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text)} for i, text in enumerate(inputs)],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+def fake_completion(request: ChatRequest) -> str:
+    """Deterministic reply: an analysis object for JSON mode, otherwise a 0-100 score"""
+    prompt = request.messages[-1]["content"]
+    digest = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+    if request.response_format and request.response_format.get("type") == "json_object":
+        if '"scores"' in prompt:
+            ids = re.findall(r"\[id (\d+)\]", prompt)
+            return json.dumps({"scores": {i: (digest + int(i) * 37) % 101 for i in ids}})
+        return json.dumps({
+            "strengths": ["Stub strength one", "Stub strength two", "Stub strength three"],
+            "risks": ["Stub risk one", "Stub risk two", "Stub risk three"],
+            "market_opportunity": "Stub market analysis.",
+            "recommendation": ["Buy", "Hold", "Pass"][digest % 3],
+            "confidence_score": round((digest % 100) / 100, 2),
+        })
+    return str(digest % 101)
+
+
+@app.post("/v1/chat/completions")
+def create_chat_completion(request: ChatRequest):
+    error = simulate_upstream()
+    if error:
+        return error
+    stats["chat_requests"] += 1
+    content = fake_completion(request)
+    prompt_tokens = sum(count_tokens(message["content"]) for message in request.messages)
+    completion_tokens = count_tokens(content)
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
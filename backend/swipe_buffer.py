@@ -0,0 +1,169 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from sqlalchemy.exc import OperationalError
+
+from backend import crud
+from backend.database import SessionLocal
+from backend.preference_learning import preference_learner
+
+MAX_EVENTS = int(os.getenv("SWIPE_BUFFER_MAX_EVENTS", "10000"))  # buffered events before new batches are refused
+FLUSH_BATCH_SIZE = int(os.getenv("SWIPE_FLUSH_BATCH_SIZE", "500"))  # events per write transaction
+FLUSH_INTERVAL_SECONDS = float(os.getenv("SWIPE_FLUSH_INTERVAL_SECONDS", "1.0"))  # max time an event waits
+FLUSH_RETRIES = int(os.getenv("SWIPE_FLUSH_RETRIES", "3"))  # retries of a batch hitting a locked database
+
+
+class SwipeBuffer:
+    """In-process queue of swipe events, written to SQLite in bulk by a background thread"""
+
+    def __init__(self, max_events: int = MAX_EVENTS, batch_size: int = FLUSH_BATCH_SIZE,
+                 interval: float = FLUSH_INTERVAL_SECONDS, max_retries: int = FLUSH_RETRIES,
+                 backoff: float = 0.25, max_backoff: float = 5.0):
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # one writer at a time
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.dropped = 0
+        self.requeued = 0
+        self.flushes = 0
+
+    def add(self, events: List[dict]) -> bool:
+        """Queue a batch of events; returns False (queuing nothing) if the buffer is full"""
+        with self._condition:
+            if len(self._events) + len(events) > self.max_events:
+                self.rejected += len(events)
+                return False
+            self._events.extend(events)
+            self.accepted += len(events)
+            if len(self._events) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def flush(self) -> int:
+        """Write everything buffered so far, batch_size events per transaction.
+
+        Stops early if a batch still finds the database locked after retrying; that
+        batch goes back to the front of the buffer for the next flush.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                if not batch:
+                    return written
+                stored = self._write(batch)
+                if stored is None:
+                    with self._condition:
+                        self._events.extendleft(reversed(batch))
+                        self.requeued += len(batch)
+                    return written
+                written += stored
+
+    def _write(self, batch: List[dict]) -> Optional[int]:
+        """Write one batch; None if the database stayed locked through every retry"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                stored = self._record(batch)
+                break
+            except OperationalError as e:
+                # Typically "database is locked": another writer held the lock past busy_timeout
+                if attempt == self.max_retries:
+                    print(f"Error writing {len(batch)} swipe events, keeping them buffered: {e}")
+                    return None
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"Swipe batch write failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+            except Exception as e:
+                # Not transient: write the events one at a time so only the bad ones are dropped
+                print(f"Error writing {len(batch)} swipe events, retrying them one by one: {e}")
+                stored = []
+                for event in batch:
+                    try:
+                        stored += self._record([event])
+                    except Exception as e:
+                        print(f"Dropping swipe event {event}: {e}")
+                break
+        with self._condition:
+            self.flushes += 1
+            self.written += len(stored)
+            self.dropped += len(batch) - len(stored)
+        return len(stored)
+
+    @staticmethod
+    def _record(events: List[dict]) -> List[dict]:
+        db = SessionLocal()
+        try:
+            return crud.record_swipes_bulk(db, events)
+        except Exception:
+            db.rollback()
+            # The learner may have applied some of these in memory; reload those profiles before a retry
+            preference_learner.forget({event["user_id"] for event in events})
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.interval
+                while not self._stopping and len(self._events) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="swipe-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher after writing whatever is still buffered"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._events:
+            print(f"Swipe buffer stopped with {len(self._events)} events unwritten")
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "buffered": len(self._events),
+                "capacity": self.max_events,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "written": self.written,
+                "dropped": self.dropped,
+                "requeued": self.requeued,
+                "flushes": self.flushes,
+            }
+
+
+swipe_buffer = SwipeBuffer()
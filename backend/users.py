@@ -0,0 +1,17 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+USER_ID_HEADER = "X-User-Id"
+DEFAULT_USER_ID = "default"  # requests without the header (e.g. older app builds) share this user
+MAX_USER_ID_LENGTH = 64
+
+
+def get_user_id(x_user_id: Optional[str] = Header(None)) -> str:
+    """Id of the calling user, taken from the X-User-Id header"""
+    if x_user_id is None:
+        return DEFAULT_USER_ID
+    user_id = x_user_id.strip()
+    if not user_id or len(user_id) > MAX_USER_ID_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid X-User-Id header")
+    return user_id